@@ -1,5 +1,6 @@
 import gradio as gr
-from build_graph import StudentAssessment
+from build_graph import get_student_assessment
+from grade_reader import start_norms_watcher
 import asyncio
 import tempfile
 import os
@@ -11,11 +12,10 @@ agent = None
 call_counter = 0
 
 async def setup_agent():
-    """Initialize the agent once when the app starts."""
+    """Initialize the agent once when the app starts; every request shares its compiled graph."""
     global agent
     if agent is None:
-        agent = StudentAssessment()
-        await agent.setup_graph()
+        agent = await get_student_assessment()
     return agent
 
 def save_html_report(html_content, input_pdf_path):
@@ -26,6 +26,13 @@ def save_html_report(html_content, input_pdf_path):
         f.write(html_content)
     return out_path
 
+def progress_banner(message, elapsed):
+    """Status line shown above a partial report while the remaining sections are written."""
+    return (
+        "<div style='background: #eef2ff; color: #4c51bf; padding: 12px 18px; border-radius: 10px; margin-bottom: 12px; font-weight: 600;'>"
+        f"🔄 {message} ({elapsed:.1f}s)</div>"
+    )
+
 async def process_pdf(pdf_path, grade_input, student_name_input):
     """Process the uploaded PDF and generate assessment, yielding status updates."""
     global call_counter
@@ -47,26 +54,25 @@ async def process_pdf(pdf_path, grade_input, student_name_input):
     try:
         yield "⏳ Initializing assessment agent...", gr.update(visible=False)
         
-        # The agent will handle PDF parsing internally via the user_input_parser node
-        agent = StudentAssessment()
-        await agent.setup_graph()
-        
-        yield "🔄 **Processing Assessment:** This may take a moment as we parse the PDF and analyze performance data...", gr.update(visible=False)
+        # The shared agent will handle PDF parsing internally via the user_input_parser node
+        assessment_agent = await setup_agent()
         
-        # Pass the PDF path directly to the agent - it will handle parsing internally
-        result = await agent.run_from_pdf(pdf_path=pdf_path, grade=grade_input, student_name=student_name_input)
+        yield "🔄 **Processing Assessment:** Parsing the PDF...", gr.update(visible=False)
         
-        if result and "messages" in result and result["messages"]:
-            final_message = result["messages"][-1]
-            if hasattr(final_message, 'content'):
-                html_report = final_message.content
-                html_file_path = save_html_report(html_report, pdf_path)
+        # Stream the run: progress messages first, then a partial report that fills in as sections are written
+        partial_report = None
+        async for event in assessment_agent.stream_from_pdf(pdf_path=pdf_path, grade=grade_input, student_name=student_name_input):
+            if event.final and event.report_html:
+                html_file_path = save_html_report(event.report_html, pdf_path)
                 # Yield the HTML report and the file path for gr.File (download button)
-                yield html_report, gr.update(value=html_file_path, visible=True)
+                yield event.report_html, gr.update(value=html_file_path, visible=True)
+            elif event.final:
+                yield "The assessment could not be completed.", gr.update(visible=False)
+            elif event.report_html or partial_report:
+                partial_report = event.report_html or partial_report
+                yield progress_banner(event.message, event.elapsed) + partial_report, gr.update(visible=False)
             else:
-                yield "Assessment complete, but no content was generated.", gr.update(visible=False)
-        else:
-            yield "The assessment could not be completed.", gr.update(visible=False)
+                yield f"🔄 **Processing Assessment:** {event.message}", gr.update(visible=False)
         
     except Exception as e:
         import traceback
@@ -207,5 +213,9 @@ def html_to_pdf(html_content):
         return tmpfile.name
 
 if __name__ == "__main__":
+    # Pick up updated EOY_Grade_levels.json norms without restarting the app
+    start_norms_watcher()
+    # Compile the graph once at startup instead of on the first request
+    asyncio.run(setup_agent())
     demo = create_interface()
     demo.launch()
\ No newline at end of file
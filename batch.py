@@ -0,0 +1,242 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from pydantic import BaseModel
+
+from build_graph import LLM_ASSESSMENT, DETERMINISTIC_ASSESSMENT, get_student_assessment
+from cohort import COHORT_COLUMNS, save_cohort
+from rate_limiter import get_rate_limiter
+
+# Manifest CSV columns; relative paths are resolved against the manifest's directory
+MANIFEST_COLUMNS = ["path", "grade", "student_name"]
+DEFAULT_CONCURRENCY = 4
+# Append-only record of finished rows in the output directory; rows recorded as 'ok' are skipped on the next run
+PROGRESS_FILE = "progress.jsonl"
+# Consolidated metrics table: the cohort columns first, so cohort.py can score or summarize it directly
+METRICS_COLUMNS = COHORT_COLUMNS + ["percentile", "performing_grade", "next_grade_threshold", "grade_level_band", "path"]
+
+
+class BatchRow(BaseModel):
+    """One report to assess."""
+    path: str
+    grade: str
+    student_name: str
+
+    @property
+    def key(self) -> str:
+        return f"{os.path.abspath(self.path)}|{self.grade}|{self.student_name}"
+
+
+def rows_from_directory(directory: str, grade: str) -> List[BatchRow]:
+    """
+    Every PDF in directory, all at the given grade. The student name is the last
+    '_'-separated part of the file name (e.g. 'IXL-Diagnostic-Report_2025-06-20_Daniel.pdf' -> 'Daniel').
+    """
+    rows = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".pdf"):
+            stem = os.path.splitext(name)[0]
+            rows.append(BatchRow(path=os.path.join(directory, name), grade=str(grade), student_name=stem.split("_")[-1]))
+    return rows
+
+
+def rows_from_manifest(manifest_path: str) -> List[BatchRow]:
+    """Rows of a manifest CSV with MANIFEST_COLUMNS headers."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in MANIFEST_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Manifest is missing columns: {missing}")
+        return [
+            BatchRow(path=os.path.join(base, r["path"].strip()), grade=r["grade"].strip(), student_name=r["student_name"].strip())
+            for r in reader if r["path"].strip()
+        ]
+
+
+class ProgressManifest:
+    """
+    Append-only JSON lines record of finished rows. Each line is flushed and synced as
+    soon as its report is written, so a crashed batch resumes after its last finished row.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        text = ""
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            for line in text.splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                self.entries[entry["key"]] = entry
+        # A line cut short without its newline must not swallow the next record
+        self._separator = "\n" if text and not text.endswith("\n") else ""
+
+    def done(self, row: BatchRow) -> bool:
+        return self.entries.get(row.key, {}).get("status") == "ok"
+
+    def record(self, entry: dict) -> None:
+        self.entries[entry["key"]] = entry
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(self._separator + json.dumps(entry) + "\n")
+            self._separator = ""
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _report_file_name(row: BatchRow) -> str:
+    stem = os.path.splitext(os.path.basename(row.path))[0]
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", row.student_name).strip("_")
+    return f"{stem}_{name}_studentassessmentreport.html"
+
+
+async def _assess(agent, row: BatchRow, html_dir: str, assessment_mode: str) -> dict:
+    """Runs one report and returns its progress entry (status 'ok' or 'error')."""
+    entry = {"key": row.key, **row.model_dump()}
+    started = time.perf_counter()
+    try:
+        final_state = await agent.run_from_pdf(row.path, row.grade, row.student_name, assessment_mode=assessment_mode)
+        metrics = final_state.get("metrics") or {}
+        if not metrics or not final_state.get("messages"):
+            raise ValueError("no subjects could be assessed")
+        html_path = os.path.join(html_dir, _report_file_name(row))
+        await asyncio.to_thread(_write_text, html_path, final_state["messages"][-1].content)
+        entry.update(
+            status="ok",
+            html=html_path,
+            stage_seconds=final_state.get("stage_seconds", {}),
+            metrics=[m.model_dump() for m in metrics.values()],
+        )
+    except Exception as e:
+        entry.update(status="error", error=str(e))
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    entry["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    return entry
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+async def run_batch(rows: List[BatchRow], out_dir: str, concurrency: int = DEFAULT_CONCURRENCY,
+                    assessment_mode: str = LLM_ASSESSMENT) -> dict:
+    """
+    Assesses every row not already recorded as finished in out_dir's progress manifest,
+    at most concurrency at a time, on the shared StudentAssessment. Each report's HTML
+    is written to out_dir/html as soon as it finishes.
+
+    Returns a summary dict with counts, wall time, throughput and per-stage timing for this run,
+    and the LLM rate limiter's counters.
+    """
+    html_dir = os.path.join(out_dir, "html")
+    os.makedirs(html_dir, exist_ok=True)
+    progress = ProgressManifest(os.path.join(out_dir, PROGRESS_FILE))
+    pending = [r for r in rows if not progress.done(r)]
+    print(f"--- {len(rows)} reports, {len(rows) - len(pending)} already done, {len(pending)} to assess "
+          f"(concurrency {concurrency}) ---")
+
+    agent = await get_student_assessment()
+    semaphore = asyncio.Semaphore(concurrency)
+    finished: List[dict] = []
+    started = time.perf_counter()
+
+    async def worker(row: BatchRow):
+        async with semaphore:
+            entry = await _assess(agent, row, html_dir, assessment_mode)
+        progress.record(entry)
+        finished.append(entry)
+        mark = "✅" if entry["status"] == "ok" else "❌"
+        print(f"{mark} [{len(finished)}/{len(pending)}] {row.student_name} ({os.path.basename(row.path)}) "
+              f"in {entry['seconds']:.1f}s{'' if entry['status'] == 'ok' else ': ' + entry['error']}")
+
+    await asyncio.gather(*(worker(r) for r in pending))
+    wall = time.perf_counter() - started
+
+    ok = [e for e in finished if e["status"] == "ok"]
+    stage_totals: Dict[str, float] = {}
+    for entry in ok:
+        for stage, seconds in entry["stage_seconds"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+    return {
+        "assessed": len(ok),
+        "failed": len(finished) - len(ok),
+        "skipped": len(rows) - len(pending),
+        "wall_seconds": round(wall, 2),
+        "reports_per_minute": round(len(ok) / wall * 60, 2) if wall > 0 else 0.0,
+        "stage_mean_seconds": {stage: round(total / len(ok), 3) for stage, total in stage_totals.items()},
+        "llm": get_rate_limiter().stats(),
+    }
+
+
+def metrics_table(progress: ProgressManifest) -> pd.DataFrame:
+    """One row per student and subject across every finished report in the progress manifest."""
+    records = []
+    for entry in progress.entries.values():
+        if entry.get("status") != "ok":
+            continue
+        for m in entry["metrics"]:
+            records.append({
+                "student_name": entry["student_name"],
+                "grade": str(entry["grade"]),
+                "path": entry["path"],
+                **m,
+            })
+    df = pd.DataFrame.from_records(records, columns=METRICS_COLUMNS)
+    for column in ("student_name", "grade", "subject", "grade_level_band"):
+        df[column] = df[column].astype(str).astype("category")
+    return df
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Assesses a directory of IXL reports (or a manifest CSV) and writes per-student HTML and consolidated metrics."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Assess a batch of IXL Diagnostic Report PDFs.")
+    parser.add_argument("source", help="Directory of PDFs, or a manifest CSV with columns: " + ", ".join(MANIFEST_COLUMNS))
+    parser.add_argument("--grade", help="Grade of every student (required for a directory)")
+    parser.add_argument("--out", help="Output directory (default: <source>_assessments)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Reports assessed at once")
+    parser.add_argument("--mode", choices=[LLM_ASSESSMENT, DETERMINISTIC_ASSESSMENT], default=LLM_ASSESSMENT,
+                        help="Assessment mode (see StudentAssessment.run_from_pdf)")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        if not args.grade:
+            parser.error("--grade is required when the source is a directory")
+        rows = rows_from_directory(args.source, args.grade)
+    else:
+        rows = rows_from_manifest(args.source)
+    out_dir = args.out or f"{os.path.splitext(os.path.normpath(args.source))[0]}_assessments"
+
+    summary = asyncio.run(run_batch(rows, out_dir, max(1, args.concurrency), args.mode))
+
+    table = metrics_table(ProgressManifest(os.path.join(out_dir, PROGRESS_FILE)))
+    table.to_csv(os.path.join(out_dir, "metrics.csv"), index=False)
+    save_cohort(table, os.path.join(out_dir, "metrics.parquet"))
+
+    print("=" * 50)
+    print(f"📦 Batch complete: {summary['assessed']} assessed, {summary['failed']} failed, {summary['skipped']} skipped")
+    print(f"⏱️ {summary['wall_seconds']}s wall, {summary['reports_per_minute']} reports/minute")
+    for stage, seconds in sorted(summary["stage_mean_seconds"].items(), key=lambda kv: -kv[1]):
+        print(f"   {stage:<20} {seconds:8.3f}s per report")
+    llm = summary["llm"]
+    print(f"🚦 LLM calls: {llm['calls']}, throttled {llm['throttled']} ({llm['retries']} retried, {llm['failed']} failed), "
+          f"concurrency window {llm['window']}")
+    print(f"📄 {len(table)} metric rows -> {os.path.join(out_dir, 'metrics.csv')}, {os.path.join(out_dir, 'metrics.parquet')}")
+    print("=" * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,57 @@
-from typing import List, Dict, Annotated, Any
+import asyncio
+import inspect
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Dict, Annotated, Any, AsyncIterator, Awaitable, Callable, Optional, Sequence, Union
 from typing_extensions import TypedDict
-from pydantic import BaseModel, Field
-from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, Field, ValidationError
+from langchain_core.messages import AIMessage, HumanMessage, message_to_dict, messages_from_dict
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 import json
+import pandas as pd
 from dotenv import load_dotenv
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-from prompts import ASSESSMENT_PROMPT, SUBJECT_MAPPING_PROMPT, SYNTHESIS_PROMPT, MULTI_PARSER_EXTRACTION_PROMPT
-from grade_reader import get_grade_data
-from model import get_llm_core, get_extraction_llm
-from tools import calculate_all_metrics
+from prompts import ASSESSMENT_PROMPT, SUBJECT_MAPPING_PROMPT, OVERVIEW_PROMPT, SUMMARY_PROMPT, MULTI_PARSER_EXTRACTION_PROMPT
+from grade_reader import get_benchmark_index, pinned_benchmark_index
+from model import get_structured_llm, get_tool_llm
+from tools import calculate_all_metrics, calculate_metrics_for_subjects
 from datetime import datetime
-from report_formatter import format_sections_to_report
-from user_input_parser import parse_pdf_to_text, SubjectPerformance
+from report_formatter import format_sections_to_report, display_subject_name, PENDING_SECTION_HTML
+from user_input_parser import parse_pdf_to_text_async, SubjectPerformance
+from ixl_extractor import extract_ixl_scores
+from prompt_compaction import compact_parser_outputs
+from pdf_parser import PDF_EXECUTOR, describe_pdf_source, is_pdf_buffer
+from node_cache import get_node_cache, node_cache_key
+from subject_matcher import confirmed_by_ranker, get_alias_table, match_subjects
+from checkpoints import open_run_checkpoints, run_id as assessment_run_id
+from cohort import (build_cohort_table, records_from_subjects, score_cohort, percentile_band_label,
+                    ABOVE_GRADE_LEVEL, ON_GRADE_LEVEL, BELOW_GRADE_LEVEL, NO_DATA)
 
 # --- Pydantic Models ---
 class PerformanceInfo(BaseModel):
     """Tool for extracting performance information from student data."""
     subjects: List[SubjectPerformance] = Field(description="List of subjects, their scores, and any recommended skills.")
 
+class SubjectMetrics(BaseModel):
+    """Benchmark metrics for one mapped subject, as calculated by the metrics tools."""
+    subject: str = Field(description="Official subject name")
+    score: int
+    percentile: int = Field(description="Highest percentile reached; 0 if none, -1 if no data for the subject and grade")
+    performing_grade: Optional[str] = Field(default=None, description="Grade label (e.g. '3', 'K'), None without benchmark data")
+    next_grade_threshold: int = Field(default=-1, description="70th percentile score for the grade, -1 if unavailable")
+    grade_level_band: str = Field(default=NO_DATA, description="'Above Grade Level', 'On Grade Level', 'Below Grade Level' or 'No Data'")
+
 class PerformanceTableRow(BaseModel):
     """Structured representation of a single row in the performance dashboard table."""
     subject_name: str = Field(description="The subject name (e.g., 'Math: Overall', 'ELA: Reading')")
     score: int = Field(description="The student's numeric score (e.g., 450, 520)")
     performance_band: str = Field(description="Performance band: 'Above Grade Level', 'On Grade Level', or 'Below Grade Level'")
     percentile: str = Field(description="Percentile with emoji (e.g., '🎉 95th percentile')")
-    next_grade_threshold: int = Field(description="Numeric threshold for next grade level")
+    next_grade_threshold: int = Field(description="Numeric threshold for next grade level, -1 if unavailable")
     performing_grade: str = Field(description="Grade level text (e.g., '3rd grade', '4th grade')")
     recommended_skills: List[str] = Field(description="List of recommended skills for this subject")
 
@@ -34,6 +59,12 @@ class PerformanceDashboard(BaseModel):
     """Structured representation of the complete performance dashboard table."""
     table_rows: List[PerformanceTableRow] = Field(description="All subject rows in the performance dashboard")
 
+class KeyFindings(BaseModel):
+    """Subjects grouped by performing grade relative to the student's grade."""
+    above_grade_level: List[str] = Field(default_factory=list)
+    on_grade_level: List[str] = Field(default_factory=list)
+    below_grade_level: List[str] = Field(default_factory=list)
+
 class SubjectMapping(BaseModel):
     """A mapping from a raw subject name to the official subject name."""
     raw_subject: str = Field(description="The subject name as extracted from the PDF report.")
@@ -43,23 +74,183 @@ class SubjectMappings(BaseModel):
     """A list of subject mappings to ensure all subjects from the PDF are correctly matched."""
     mappings: List[SubjectMapping]
 
+class ReportOverview(BaseModel):
+    """Structured output for the overview section of the report."""
+    overview: str = Field(description="2-3 sentence overview of overall performance")
+
+class ReportSummary(BaseModel):
+    """Structured output for the summary section of the report."""
+    summary: str = Field(description="Summary section with key strengths, areas for improvement, and readiness assessment, as an HTML list")
+
 class AssessmentReport(BaseModel):
-    """Structured output for the synthesis node to ensure all sections are present."""
-    key_findings: str = Field(description="Key findings section with above/on/below grade level subjects")
+    """All sections of the final report. Dashboard and key findings are computed; only overview and summary are written by the LLM."""
+    key_findings: KeyFindings = Field(description="Key findings section with above/on/below grade level subjects")
     overview: str = Field(description="2-3 sentence overview of overall performance")
     performance_dashboard: PerformanceDashboard = Field(description="Structured performance dashboard data")
     summary: str = Field(description="Summary section with key strengths, areas for improvement, and readiness assessment")
-    methodology: str = Field(description="Methodology section explaining data sources")
+    methodology: str = Field(default="", description="Methodology section explaining data sources; the standard text when empty")
+
+_KEY_FINDINGS_GROUPS = {
+    ABOVE_GRADE_LEVEL: "above_grade_level",
+    ON_GRADE_LEVEL: "on_grade_level",
+    BELOW_GRADE_LEVEL: "below_grade_level",
+}
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def _grade_text(grade: str) -> str:
+    """Grade label as shown in the dashboard (e.g. '3' -> '3rd grade', 'K' -> 'Kindergarten')."""
+    label = str(grade).strip()
+    if label.upper() == "K":
+        return "Kindergarten"
+    return f"{_ordinal(int(label))} grade" if label.isdigit() else label
+
+def score_subjects(subjects: List[dict], grade: str) -> Dict[str, SubjectMetrics]:
+    """Calculates SubjectMetrics for mapped subjects (dicts with 'subject' and 'score') in one vectorized call."""
+    if not subjects:
+        return {}
+    scored = score_cohort(build_cohort_table(records_from_subjects("", grade, subjects)))
+    return {
+        row.subject: SubjectMetrics(
+            subject=row.subject,
+            score=int(row.score),
+            percentile=int(row.percentile),
+            performing_grade=None if pd.isna(row.performing_grade) else str(row.performing_grade),
+            next_grade_threshold=int(row.next_grade_threshold),
+            grade_level_band=str(row.grade_level_band),
+        )
+        for row in scored.itertuples(index=False)
+    }
+
+def merge_metrics(current: Dict[str, SubjectMetrics], new: Dict[str, SubjectMetrics]) -> Dict[str, SubjectMetrics]:
+    """AgentState reducer: per-subject results from later tool calls replace earlier ones."""
+    return {**(current or {}), **(new or {})}
+
+def add_stage_seconds(current: Dict[str, float], new: Dict[str, float]) -> Dict[str, float]:
+    """AgentState reducer: sums wall time per graph node (the assessment loop can run a node several times)."""
+    totals = dict(current or {})
+    for stage, seconds in (new or {}).items():
+        totals[stage] = round(totals.get(stage, 0.0) + seconds, 4)
+    return totals
+
+def metrics_prompt_json(metrics: Dict[str, SubjectMetrics], subjects_json: str) -> str:
+    """Compact JSON of the per-subject results (with recommended skills) that the prose prompts are written from."""
+    skills = {s["subject"]: s.get("recommended_skills", []) for s in (json.loads(subjects_json) if subjects_json else [])}
+    rows = [
+        {
+            "subject": display_subject_name(m.subject),
+            "score": m.score,
+            "percentile": m.percentile,
+            "performing_grade": m.performing_grade,
+            "grade_level": m.grade_level_band,
+            "next_grade_threshold": m.next_grade_threshold,
+            "recommended_skills": skills.get(m.subject, []),
+        }
+        for m in metrics.values() if m.percentile >= 0
+    ]
+    return json.dumps(rows, separators=(",", ":"), ensure_ascii=False)
+
+def build_dashboard(metrics: Dict[str, SubjectMetrics], subjects_json: str) -> tuple:
+    """
+    Builds the performance dashboard and key findings directly from the per-subject
+    metrics, with no LLM involved. Rows follow the order of subjects_json; subjects
+    without benchmark data for the student's grade are left out of both.
+
+    Returns:
+        (PerformanceDashboard, KeyFindings)
+    """
+    subjects = json.loads(subjects_json) if subjects_json else []
+    rows: List[PerformanceTableRow] = []
+    findings: Dict[str, List[str]] = {group: [] for group in _KEY_FINDINGS_GROUPS.values()}
+    for subject in subjects:
+        m = metrics.get(subject["subject"])
+        if m is None or m.grade_level_band == NO_DATA or m.percentile < 0:
+            print(f"--- No benchmark data for '{subject['subject']}', left out of the dashboard ---")
+            continue
+        name = display_subject_name(m.subject)
+        emoji = percentile_band_label(m.percentile).split()[0] if m.percentile >= 1 else ""
+        rows.append(PerformanceTableRow(
+            subject_name=name,
+            score=m.score,
+            performance_band=m.grade_level_band,
+            percentile=f"{emoji} {_ordinal(m.percentile)} percentile".strip(),
+            next_grade_threshold=m.next_grade_threshold,
+            performing_grade=_grade_text(m.performing_grade),
+            recommended_skills=subject.get("recommended_skills", []),
+        ))
+        findings[_KEY_FINDINGS_GROUPS[m.grade_level_band]].append(name)
+    return PerformanceDashboard(table_rows=rows), KeyFindings(**findings)
+
+class ProgressEvent(BaseModel):
+    """One progress update from StudentAssessment.stream_from_pdf."""
+    stage: str = Field(description="Graph node or report section the update comes from")
+    message: str = Field(description="Short human-readable progress message")
+    elapsed: float = Field(description="Seconds since the run started")
+    report_html: Optional[str] = Field(default=None, description="Partial (or, when final, complete) HTML report")
+    final: bool = False
+
+def _emit_progress(stage: str, message: str, **data) -> None:
+    """Sends a progress update to stream_from_pdf consumers; a no-op for ainvoke runs."""
+    get_stream_writer()({"stage": stage, "message": message, **data})
 
 # --- State Management ---
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
     grade: str
     student_name: str
-    pdf_path: str  # PDF path for the user_input_parser node
+    pdf_path: str  # PDF path for the user_input_parser node; in-memory PDFs come in through config (see _graph_session)
     student_performance_data: List[SubjectPerformance] #Raw subjects + student scores and recommended skills from PDF
     subject_mapping: Dict[str, str]  # Definitive mapping from raw -> official
     subjects_json: str  # JSON string of mapped subjects with scores and recommended skills
+    norms_version: str  # Version of the benchmark norms pinned for this run
+    assessment_mode: str  # "llm" (tool-calling loop) or "deterministic" (direct metrics node)
+    metrics: Annotated[Dict[str, SubjectMetrics], merge_metrics]  # Per-subject results by official name, collected as the tools run
+    stage_seconds: Annotated[Dict[str, float], add_stage_seconds]  # Wall time spent in each graph node
+
+# Assessment modes selectable per run in StudentAssessment.run_from_pdf
+LLM_ASSESSMENT = "llm"
+DETERMINISTIC_ASSESSMENT = "deterministic"
+
+def _has_report(state: dict) -> bool:
+    """Whether a run's state holds a finished report (the synthesis node ran)."""
+    return "synthesis" in state.get("stage_seconds", {})
+
+
+class _SharedRun:
+    """
+    An in-flight agent run and the number of callers awaiting it. A streamed run also
+    keeps the ProgressEvents published so far, so a caller joining late sees them all.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.events: List["ProgressEvent"] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.closed = False
+
+    def publish(self, event: "ProgressEvent") -> None:
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def close(self) -> None:
+        """Ends every subscriber's stream (None marks the end)."""
+        self.closed = True
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        if self.closed:
+            queue.put_nowait(None)
+        self.subscribers.append(queue)
+        return queue
+
 
 # --- Agent Class ---
 class StudentAssessment(BaseModel):
@@ -67,8 +258,17 @@ class StudentAssessment(BaseModel):
     graph: Any = Field(default=None, init=False)
     llm_with_tools: Any = Field(default=None, init=False)
     mapping_llm: Any = Field(default=None, init=False)
-    synthesis_llm: Any = Field(default=None, init=False)
+    overview_llm: Any = Field(default=None, init=False)
+    summary_llm: Any = Field(default=None, init=False)
     tools: List = Field(default_factory=list, exclude=True)
+    tool_node: Any = Field(default=None, init=False)
+    use_node_cache: bool = Field(default=True, description="Serve LLM node results from the node cache when their inputs are unchanged.")
+    node_cache: Any = Field(default=None, init=False)
+    in_flight_runs: Dict[str, Any] = Field(default_factory=dict, exclude=True)
+    use_checkpoints: bool = Field(
+        default_factory=lambda: os.getenv("ASSESSMENT_CHECKPOINTS", "0") == "1",
+        description="Checkpoint runs (keyed by PDF hash, grade and name) so a failed or cancelled run resumes from its last completed node.",
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -77,22 +277,47 @@ class StudentAssessment(BaseModel):
         """Initializes the LLMs and builds the graph."""
         print("--- Setting up agent graph ---")
         print(f"--- Agent setup called at {id(self)} ---")
-        self.tools = [calculate_all_metrics]  # Use the combined tool instead of three separate tools
-        llm = get_llm_core()
-        self.llm_with_tools = llm.bind_tools(self.tools)
-        self.mapping_llm = llm.with_structured_output(SubjectMappings)
-        self.synthesis_llm = llm.with_structured_output(AssessmentReport)
+        # Bulk tool covers every subject in one LLM turn; the per-subject tool is kept as a fallback
+        self.tools = [calculate_metrics_for_subjects, calculate_all_metrics]
+        # Shared, pre-bound runnables from the process-wide registry in model.py
+        self.llm_with_tools = get_tool_llm(self.tools)
+        self.mapping_llm = get_structured_llm(SubjectMappings)
+        self.overview_llm = get_structured_llm(ReportOverview)
+        self.summary_llm = get_structured_llm(ReportSummary)
+        self.node_cache = get_node_cache() if self.use_node_cache else None
         self.graph = await self.build_graph()
         
         return self.graph
 
-    def user_input_parser_node(self, state: AgentState) -> dict:
+    async def _ainvoke_cached(self, node: str, llm: Any, llm_input: Any, schema: Any = None, tools: Sequence = ()) -> Any:
+        """
+        Awaits llm on llm_input, or returns the cached result of an identical earlier call.
+        schema is the pydantic output model of structured-output LLMs; otherwise the result is a message.
+        tools are the tools llm is bound to. A cached entry that no longer loads is treated as a miss.
+        """
+        if self.node_cache is None:
+            return await llm.ainvoke(llm_input)
+        key = node_cache_key(node, llm_input, schema, tools)
+        cached = await asyncio.to_thread(self.node_cache.get, key)
+        if cached is not None:
+            try:
+                result = schema.model_validate(cached) if schema else messages_from_dict([cached])[0]
+                print(f"--- {node}: inputs unchanged, using cached result ---")
+                return result
+            except (ValidationError, KeyError, TypeError, ValueError) as e:
+                print(f"--- {node}: cached result no longer loads ({type(e).__name__}), calling the LLM ---")
+        result = await llm.ainvoke(llm_input)
+        await asyncio.to_thread(self.node_cache.put, key, result.model_dump() if schema else message_to_dict(result))
+        return result
+
+    async def user_input_parser_node(self, state: AgentState, config: RunnableConfig) -> dict:
         """
         Orchestrates the end-to-end process of parsing a PDF and extracting
         structured subject and score data using multiple strategies.
 
         Args:
             state: AgentState containing the pdf_path and other information.
+            config: Run config; configurable["pdf_bytes"] holds the PDF content of in-memory runs.
 
         Returns:
             A dict with student_performance_data populated.
@@ -101,18 +326,30 @@ class StudentAssessment(BaseModel):
         print("🔍 USER INPUT PARSER NODE")
         print("=" * 50)
         
-        pdf_path = state["pdf_path"]
-        
-        # 1. Get raw text using the parsing function from user_input_parser.py
-        result = parse_pdf_to_text(pdf_path)
+        pdf_source = config.get("configurable", {}).get("pdf_bytes") or state["pdf_path"]
+
+        # 1. Read the scores straight from the PDF layout; the LLM is only needed when this is not confident
+        # PyMuPDF work is CPU-bound, so it runs on the bounded PDF executor rather than the event loop
+        extraction = await asyncio.get_running_loop().run_in_executor(PDF_EXECUTOR, extract_ixl_scores, pdf_source)
+        if extraction.confident:
+            print(f"--- Rule-based extraction complete. Found {len(extraction.subjects)} subjects. ---")
+            _emit_progress("user_input_parser", f"📄 Parsed {extraction.page_count} pages, {len(extraction.subjects)} subjects found")
+            return {"student_performance_data": extraction.subjects}
+        print(f"--- Rule-based extraction not confident ({'; '.join(extraction.issues)}), falling back to LLM ---")
+
+        # 2. Get raw text using the parsing function from user_input_parser.py
+        result = await parse_pdf_to_text_async(pdf_source)
         if not result:
             print("--- PDF parsing failed, returning empty list ---")
             return {"student_performance_data": []}
         pymupdf_text, llamaparse_text = result
+        _emit_progress("user_input_parser", f"📄 Parsed {pymupdf_text.count(chr(12)) + 1} pages, extracting subjects...")
+        pymupdf_text, llamaparse_text, compaction = compact_parser_outputs(pymupdf_text, llamaparse_text)
+        print(f"--- Compacted parser outputs: ~{compaction['tokens_before']} -> ~{compaction['tokens_after']} tokens ---")
 
-        # 2. Use a structured LLM call to extract subjects and scores from the parsed text
+        # 3. Use a structured LLM call to extract subjects and scores from the parsed text
         print("--- Extracting subjects and scores from parsed text ---")
-        extraction_llm = get_extraction_llm().with_structured_output(PerformanceInfo)
+        extraction_llm = get_structured_llm(PerformanceInfo)
 
         prompt = MULTI_PARSER_EXTRACTION_PROMPT.format(
             pymupdf_text=pymupdf_text,
@@ -120,23 +357,39 @@ class StudentAssessment(BaseModel):
         )
 
         try:
-            extraction_result = extraction_llm.invoke(prompt)
+            extraction_result = await self._ainvoke_cached("user_input_parser", extraction_llm, prompt, PerformanceInfo)
             print(f"--- Extraction complete. Found {len(extraction_result.subjects)} subjects. ---")
+            _emit_progress("user_input_parser", f"🔎 {len(extraction_result.subjects)} subjects found")
             return {"student_performance_data": extraction_result.subjects}
         except Exception as e:
             print(f"--- Error during subject extraction: {e} ---")
             return {"student_performance_data": []}
 
-    def subject_mapping_node(self, state: AgentState) -> dict:
-        """Uses the mapping_llm to map raw subjects to official subjects."""
+    async def subject_mapping_node(self, state: AgentState) -> dict:
+        """
+        Maps raw subjects to official subjects, locally through the alias table and fuzzy
+        matching first; only low-confidence subjects are sent to the mapping_llm.
+        """
         print("=" * 50)
         print("🔍 SUBJECT MAPPING NODE")
         print("=" * 50)
         raw_subjects = [s.subject for s in state["student_performance_data"]]
-        official_subjects = get_grade_data()['Subject'].unique().tolist()        
-        prompt = SUBJECT_MAPPING_PROMPT.format(raw_subjects=raw_subjects, official_subjects=official_subjects)
-        mapping_result = self.mapping_llm.invoke(prompt)
-        mapping_dict = {m.raw_subject: m.official_subject for m in mapping_result.mappings}
+        official_subjects = list(get_benchmark_index().subjects)
+        aliases = get_alias_table()
+        mapping_dict, unresolved = match_subjects(raw_subjects, official_subjects, state["grade"], aliases)
+        print(f"--- Matched {len(mapping_dict)} subjects locally, {len(unresolved)} need the LLM ---")
+
+        if unresolved:
+            unresolved_subjects = [m.raw_subject for m in unresolved]
+            prompt = SUBJECT_MAPPING_PROMPT.format(raw_subjects=unresolved_subjects, official_subjects=official_subjects)
+            mapping_result = await self._ainvoke_cached("map_subjects", self.mapping_llm, prompt, SubjectMappings)
+            llm_mappings = {m.raw_subject: m.official_subject for m in mapping_result.mappings}
+            mapping_dict.update(llm_mappings)
+            # Remember LLM answers the fuzzy ranker agrees with, so these names map locally next time
+            await asyncio.to_thread(aliases.learn, {
+                raw: official for raw, official in llm_mappings.items()
+                if raw in unresolved_subjects and confirmed_by_ranker(raw, official, official_subjects)
+            })
         
         # Create mapped subjects JSON
         mapped_subjects = []
@@ -153,7 +406,7 @@ class StudentAssessment(BaseModel):
         
         return {"subject_mapping": mapping_dict, "subjects_json": subjects_json}
 
-    def assessment_node(self, state: AgentState) -> dict:
+    async def assessment_node(self, state: AgentState) -> dict:
         """
         Prepares the assessment data and invokes the LLM with the current state to decide on the next action,
         which is either calling a tool or concluding the analysis.
@@ -171,18 +424,41 @@ class StudentAssessment(BaseModel):
                 subjects_json=state["subjects_json"],
             )            
             messages_to_invoke = [HumanMessage(content=assessment_prompt_str)]
-            response = self.llm_with_tools.invoke(messages_to_invoke)            
+            response = await self._ainvoke_cached("assessment", self.llm_with_tools, messages_to_invoke, tools=self.tools)
             # On the first run, we must return both the human prompt and the AI's response
             # to properly initialize the conversation history.
             return {"messages": [messages_to_invoke[0], response]}
 
         # For subsequent calls, the message history is already populated with tool responses.
-        response = self.llm_with_tools.invoke(state["messages"])
-        # print ('Subsequent calls: state["messages"]', state["messages"])
-        # Append the new response to the existing messages instead of replacing them
-        return {"messages": state["messages"] + [response]}
+        response = await self._ainvoke_cached("assessment", self.llm_with_tools, state["messages"], tools=self.tools)
+        # add_messages appends the new response, so only the response is returned
+        return {"messages": [response]}
+
+    async def tools_node(self, state: AgentState, config: RunnableConfig) -> dict:
+        """
+        Executes the tool calls of the last assessment response. The typed per-subject
+        results in state["metrics"] are scored from the mapped subjects_json, as in
+        metrics_node, so subjects or scores the LLM dropped or changed in its tool
+        calls only affect the transcript, never the numbers in the report.
+        """
+        update = await self.tool_node.ainvoke(state, config)
+        metrics = score_subjects(json.loads(state["subjects_json"] or "[]"), state["grade"])
+        print(f"--- Tools ran, metrics recorded for {len(metrics)} mapped subjects ---")
+        return {**update, "metrics": metrics}
+
+    async def metrics_node(self, state: AgentState) -> dict:
+        """
+        Deterministic alternative to the assessment/tool loop: computes every subject's
+        metrics directly from subjects_json into state["metrics"], with no LLM call.
+        """
+        print("=" * 50)
+        print("🧮 METRICS NODE")
+        print("=" * 50)
 
-    def synthesis_node(self, state: AgentState) -> dict:
+        metrics = score_subjects(json.loads(state["subjects_json"] or "[]"), state["grade"])
+        return {"metrics": metrics}
+
+    async def synthesis_node(self, state: AgentState) -> dict:
         """
         Generates the final student report after all tool calls are complete.
         """
@@ -194,33 +470,74 @@ class StudentAssessment(BaseModel):
         grade = state["grade"]
         student_name = state["student_name"]
         current_date = datetime.now().strftime("%B %d, %Y")
-        
-        synthesis_prompt_str = SYNTHESIS_PROMPT.format(
-            grade=grade,
-            student_name=student_name,
-            current_date=current_date,
-        )        
-        synthesis_prompt = HumanMessage(content=synthesis_prompt_str)
-        # Get structured output from the LLM
-        structured_report = self.synthesis_llm.invoke(state["messages"] + [synthesis_prompt])
+
+        # Subjects without metrics (the LLM finished without calling a tool) are scored directly,
+        # so the report covers every mapped subject
+        subjects = json.loads(state["subjects_json"] or "[]")
+        metrics = dict(state.get("metrics") or {})
+        missing = [s for s in subjects if s["subject"] not in metrics]
+        scored_here = score_subjects(missing, grade)
+        if missing:
+            print(f"--- No metrics recorded for {len(missing)} subjects, scoring them directly ---")
+            metrics.update(scored_here)
+
+        # Numbers come straight from the metrics; the LLM only writes the prose sections,
+        # from a compact JSON of the results rather than the tool-call transcript
+        dashboard, key_findings = build_dashboard(metrics, state["subjects_json"])
+        prompt_args = dict(grade=grade, student_name=student_name, metrics_json=metrics_prompt_json(metrics, state["subjects_json"]))
+        overview_prompt = OVERVIEW_PROMPT.format(**prompt_args)
+        summary_prompt = SUMMARY_PROMPT.format(**prompt_args)
+
+        async def write_section(section: str, llm: Any, prompt: str, schema: Any) -> str:
+            result = await self._ainvoke_cached(f"synthesis_{section}", llm, prompt, schema)
+            text = getattr(result, section)
+            # Streamed to the UI as soon as it is written, without waiting for the other section
+            _emit_progress(section, f"✍️ {section.title()} written", section=section, content=text)
+            return text
+
+        # The two sections are independent, so they are requested concurrently
+        overview, summary = await asyncio.gather(
+            write_section("overview", self.overview_llm, overview_prompt, ReportOverview),
+            write_section("summary", self.summary_llm, summary_prompt, ReportSummary),
+        )
+        structured_report = AssessmentReport(
+            key_findings=key_findings,
+            overview=overview,
+            performance_dashboard=dashboard,
+            summary=summary,
+        )
         # Convert structured output to formatted HTML report
-        formatted_report = format_sections_to_report(structured_report, student_name, grade, current_date)
+        formatted_report = format_sections_to_report(
+            structured_report, student_name, grade, current_date, norms_version=state.get("norms_version", "")
+        )
         # Create a proper AIMessage with the formatted content
-        from langchain_core.messages import AIMessage
         response = AIMessage(content=formatted_report)
-        # Return only the new message
-        return {"messages": [response]}
+        # Return the report, plus any metrics scored here so the final state covers every subject in it
+        return {"messages": [response], "metrics": scored_here}
     
+    @staticmethod
+    def _timed(stage: str, node: Any) -> Any:
+        """Wraps a node so its wall time is added to state["stage_seconds"][stage]."""
+        takes_config = "config" in inspect.signature(node).parameters
+
+        async def timed_node(state: AgentState, config: RunnableConfig) -> dict:
+            started = time.perf_counter()
+            update = await (node(state, config) if takes_config else node(state))
+            return {**(update or {}), "stage_seconds": {stage: time.perf_counter() - started}}
+
+        return timed_node
+
     async def build_graph(self) -> StateGraph:
         """Builds the LangGraph agent."""
         graph_builder = StateGraph(AgentState)
-        tool_node = ToolNode(self.tools)
+        self.tool_node = ToolNode(self.tools)
 
-        graph_builder.add_node("user_input_parser", self.user_input_parser_node)
-        graph_builder.add_node("map_subjects", self.subject_mapping_node)
-        graph_builder.add_node("assessment", self.assessment_node)
-        graph_builder.add_node("execute_tools", tool_node)
-        graph_builder.add_node("synthesis", self.synthesis_node)
+        graph_builder.add_node("user_input_parser", self._timed("user_input_parser", self.user_input_parser_node))
+        graph_builder.add_node("map_subjects", self._timed("map_subjects", self.subject_mapping_node))
+        graph_builder.add_node("assessment", self._timed("assessment", self.assessment_node))
+        graph_builder.add_node("compute_metrics", self._timed("compute_metrics", self.metrics_node))
+        graph_builder.add_node("execute_tools", self._timed("execute_tools", self.tools_node))
+        graph_builder.add_node("synthesis", self._timed("synthesis", self.synthesis_node))
 
         graph_builder.set_entry_point("user_input_parser")
         
@@ -230,8 +547,12 @@ class StudentAssessment(BaseModel):
             lambda output: "map_subjects" if output and output.get("student_performance_data") and len(output["student_performance_data"]) > 0 else END,
         )
         
-        # Direct edge from map_subjects to assessment
-        graph_builder.add_edge("map_subjects", "assessment")
+        # From map_subjects, either run the LLM tool loop or compute metrics directly
+        graph_builder.add_conditional_edges(
+            "map_subjects",
+            lambda state: "compute_metrics" if state.get("assessment_mode") == DETERMINISTIC_ASSESSMENT else "assessment",
+        )
+        graph_builder.add_edge("compute_metrics", "synthesis")
         
         # Conditional edge from assessment - if tools needed, go to execute_tools, else synthesis
         graph_builder.add_conditional_edges(
@@ -248,29 +569,301 @@ class StudentAssessment(BaseModel):
         # Set recursion limit when compiling the graph (removed, not supported)
         return graph_builder.compile(checkpointer=None, interrupt_before=None, interrupt_after=None, debug=False)
 
-    async def run_from_pdf(self, pdf_path: str, grade: str, student_name: str):
-        """Runs the agent starting from a PDF path, letting the graph handle parsing internally."""
-        if self.graph is None:
-            await self.setup_graph()
+    async def run_from_pdf(self, pdf_path: str, grade: str, student_name: str, assessment_mode: str = LLM_ASSESSMENT):
+        """
+        Runs the agent starting from a PDF path, letting the graph handle parsing internally.
+
+        assessment_mode selects how metrics are computed: LLM_ASSESSMENT runs the
+        tool-calling loop, DETERMINISTIC_ASSESSMENT computes them directly in metrics_node.
+        """
+        return await self._run(pdf_path, None, grade, student_name, assessment_mode)
 
-        # Start with just the PDF path - the user_input_parser node will handle the rest
-        initial_state: AgentState = {
+    async def run_from_pdf_bytes(self, pdf_bytes: Union[bytes, bytearray, memoryview], grade: str, student_name: str,
+                                 assessment_mode: str = LLM_ASSESSMENT):
+        """
+        Same as run_from_pdf, for a PDF received in memory (e.g. from another system).
+
+        The buffer is parsed, hashed and cached in place; nothing is written to disk
+        unless LlamaParse has to run, since it only reads from a file.
+        """
+        if isinstance(pdf_bytes, bytearray):
+            # A read-only view, so the caller's buffer can't change under a running parse
+            pdf_bytes = memoryview(pdf_bytes).toreadonly()
+        return await self._run("", pdf_bytes, grade, student_name, assessment_mode)
+
+    def _initial_state(self, pdf_path: str, grade: str, student_name: str, assessment_mode: str,
+                       norms_version: str) -> AgentState:
+        if assessment_mode not in (LLM_ASSESSMENT, DETERMINISTIC_ASSESSMENT):
+            raise ValueError(f"Unknown assessment mode: {assessment_mode}")
+        # Start with just the PDF - the user_input_parser node will handle the rest
+        return {
             "pdf_path": pdf_path,  # Add PDF path to state
-            "grade": grade, 
-            "student_name": student_name, 
+            "grade": grade,
+            "student_name": student_name,
             "messages": [],
             "student_performance_data": [],  # Will be populated by user_input_parser node
-            "subject_mapping": {}, 
-            "subjects_json": ""
+            "subject_mapping": {},
+            "subjects_json": "",
+            "norms_version": norms_version,
+            "assessment_mode": assessment_mode,
+            "metrics": {},
+            "stage_seconds": {},
         }
-        
-        print(f"--- Starting agent run from PDF: {pdf_path} ---")
-        print(f"--- Setting recursion limit to 300 ---")
-        
-        # Increased recursion limit to allow for all tool calls
-        final_state = await self.graph.ainvoke(initial_state, config={"recursion_limit": 100})
+
+    async def _single_flight_key(self, pdf_source: Any, grade: str, student_name: str,
+                                 assessment_mode: str) -> Optional[str]:
+        """Key shared by identical requests (same PDF content, grade, student name and mode); None if the PDF is unreadable."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(PDF_EXECUTOR, assessment_run_id, pdf_source, grade, student_name, assessment_mode)
+        except OSError:
+            # Unreadable PDF: nothing to share, the run reports it
+            return None
+
+    @contextmanager
+    def _joined_run(self, key: Optional[str], start: Callable[[_SharedRun], Awaitable[Any]], student_name: str):
+        """
+        Yields the in-flight run for key, starting it with start(shared) if there is none
+        (a None key always starts a run of its own). The caller counts as waiting until the
+        block exits; the run is cancelled once no caller is left waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        shared = self.in_flight_runs.get(key) if key is not None else None
+        if shared is None or shared.task.get_loop() is not loop:
+            shared = _SharedRun()
+            shared.task = loop.create_task(start(shared))
+            if key is not None:
+                self.in_flight_runs[key] = shared
+                shared.task.add_done_callback(lambda _: self.in_flight_runs.pop(key, None) if self.in_flight_runs.get(key) is shared else None)
+        else:
+            print(f"--- Identical run for {student_name} already in progress, waiting for its result ({shared.waiters} waiting) ---")
+
+        shared.waiters += 1
+        try:
+            yield shared
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                shared.task.cancel()
+
+    async def _run(self, pdf_path: str, pdf_bytes: Optional[Union[bytes, memoryview]], grade: str, student_name: str,
+                   assessment_mode: str):
+        """
+        Single-flight front of _run_graph: concurrent identical requests (same PDF content,
+        grade, student name and mode, e.g. a double-clicked "Analyze Report") await one
+        shared run and all receive its result. A cancelled caller only stops waiting; the
+        shared run is cancelled once no caller is left waiting for it.
+        """
+        key = await self._single_flight_key(pdf_bytes or pdf_path, grade, student_name, assessment_mode)
+
+        def start(_: _SharedRun):
+            return self._run_graph(pdf_path, pdf_bytes, grade, student_name, assessment_mode)
+
+        with self._joined_run(key, start, student_name) as shared:
+            # shield: cancelling this caller must not cancel the run other callers are waiting on
+            final_state = await asyncio.shield(shared.task)
+        # Each caller gets its own top-level dict
+        return dict(final_state)
+
+    async def _run_graph(self, pdf_path: str, pdf_bytes: Optional[Union[bytes, memoryview]], grade: str, student_name: str,
+                         assessment_mode: str):
+        if self.graph is None:
+            await self.setup_graph()
+
+        # Pin one norms snapshot for the whole run; a hot reload only affects later runs
+        with pinned_benchmark_index() as norms:
+            initial_state = self._initial_state(pdf_path, grade, student_name, assessment_mode, norms.version)
+            
+            print(f"--- Starting agent run from PDF: {describe_pdf_source(pdf_bytes or pdf_path)} (norms version {norms.version}) ---")
+            print(f"--- Setting recursion limit to 300 ---")
+            
+            async with self._graph_session(initial_state, pdf_bytes or pdf_path) as (graph, graph_input, config):
+                final_state = await graph.ainvoke(graph_input, **config)
         return final_state
 
+    @asynccontextmanager
+    async def _graph_session(self, initial_state: AgentState, pdf_source: Any):
+        """
+        Yields (graph, input, invoke kwargs) for one run. With use_checkpoints, the run is
+        checkpointed after every node under a run ID derived from the PDF content, grade, name
+        and assessment mode: a run that failed or was cancelled resumes from its last completed
+        node, and one that already completed returns its stored result, unless the norms
+        changed since. The run is marked completed when the block exits with a report, and
+        failed when it raises. A run still in progress elsewhere (e.g. another process) is
+        not resumed; this one then runs without checkpoints.
+
+        In-memory PDF content is passed to the graph in config["configurable"]["pdf_bytes"]
+        rather than in the state, so it is never written to a checkpoint; a resumed run is
+        given the same bytes again by its caller (the run ID is their content hash).
+        """
+        # Increased recursion limit to allow for all tool calls
+        config = {"recursion_limit": 100, "configurable": {}}
+        if is_pdf_buffer(pdf_source):
+            config["configurable"]["pdf_bytes"] = pdf_source
+        if not self.use_checkpoints:
+            yield self.graph, initial_state, {"config": config}
+            return
+
+        async with open_run_checkpoints() as checkpoints:
+            await checkpoints.prune()
+            run_id = await checkpoints.run_id(
+                pdf_source, initial_state["grade"], initial_state["student_name"], initial_state["assessment_mode"]
+            )
+            if await checkpoints.is_running(run_id):
+                print(f"--- Run {run_id} is already in progress elsewhere, running without checkpoints ---")
+                yield self.graph, initial_state, {"config": config}
+                return
+            config["configurable"]["thread_id"] = run_id
+            graph = self.graph.copy(update={"checkpointer": checkpoints.saver})
+            graph_input = initial_state
+            snapshot = await graph.aget_state(config)
+            saved = snapshot.values
+            if saved:
+                if saved.get("norms_version") != initial_state["norms_version"]:
+                    print(f"--- Run {run_id} was checkpointed with other norms, starting over ---")
+                    await checkpoints.forget(run_id)
+                elif not snapshot.next and not _has_report(saved):
+                    print(f"--- Run {run_id} was checkpointed without a report, starting over ---")
+                    await checkpoints.forget(run_id)
+                else:
+                    print(f"--- Resuming checkpointed run {run_id} ---")
+                    graph_input = None
+            await checkpoints.mark(run_id, "running")
+            # Each checkpoint is written before the next node starts, so nothing completed is lost
+            try:
+                yield graph, graph_input, {"config": config, "durability": "sync"}
+            except BaseException:
+                # Also on cancellation: the run is no longer in progress and may be resumed
+                await checkpoints.mark(run_id, "failed")
+                raise
+            if _has_report((await graph.aget_state(config)).values):
+                await checkpoints.mark(run_id, "completed")
+            else:
+                # The graph ended early (no subjects extracted, possibly a temporary parsing
+                # failure): nothing worth replaying, the next identical request starts over
+                await checkpoints.forget(run_id)
+
+    async def stream_from_pdf(self, pdf_path: str, grade: str, student_name: str,
+                              assessment_mode: str = LLM_ASSESSMENT) -> AsyncIterator[ProgressEvent]:
+        """
+        Runs the agent like run_from_pdf, yielding ProgressEvents as the graph advances.
+
+        As soon as the subjects are mapped, the dashboard and key findings are computed
+        and a partial report is yielded with the prose sections pending; the overview and
+        summary are filled in as each is written. The last event is final and carries the
+        complete report. Time to first useful content (the first partial report) is
+        printed with the total run time.
+
+        Identical concurrent streams share one run like run_from_pdf does: every caller
+        receives every event, a caller joining late first gets the events already sent.
+        """
+        if self.graph is None:
+            await self.setup_graph()
+        key = await self._single_flight_key(pdf_path, grade, student_name, assessment_mode)
+        if key is not None:
+            # Streamed and plain runs produce different results, so they are shared separately
+            key = f"{key}:stream"
+
+        def start(shared: _SharedRun):
+            return self._stream_graph(shared, pdf_path, grade, student_name, assessment_mode)
+
+        with self._joined_run(key, start, student_name) as shared:
+            queue = shared.subscribe()
+            try:
+                while (event := await queue.get()) is not None:
+                    yield event
+                # Re-raise anything the graph raised
+                await asyncio.shield(shared.task)
+            finally:
+                shared.subscribers.remove(queue)
+
+    async def _stream_graph(self, shared: _SharedRun, pdf_path: str, grade: str, student_name: str,
+                            assessment_mode: str) -> None:
+        """Runs the graph for stream_from_pdf, publishing its ProgressEvents to shared."""
+        started = time.perf_counter()
+
+        def publish(stage: str, message: str, report_html: Optional[str] = None, final: bool = False) -> None:
+            elapsed = round(time.perf_counter() - started, 2)
+            shared.publish(ProgressEvent(stage=stage, message=message, elapsed=elapsed, report_html=report_html, final=final))
+
+        async def produce():
+            # The graph runs in the shared run's own task, so the norms pin is set and reset in
+            # one context however the callers iterate their streams
+            first_content = None
+            finished = False
+            with pinned_benchmark_index() as norms:
+                initial_state = self._initial_state(pdf_path, grade, student_name, assessment_mode, norms.version)
+                print(f"--- Streaming agent run from PDF: {describe_pdf_source(pdf_path)} (norms version {norms.version}) ---")
+                current_date = datetime.now().strftime("%B %d, %Y")
+                partial: Optional[AssessmentReport] = None
+
+                def render(report: AssessmentReport) -> str:
+                    return format_sections_to_report(report, student_name, grade, current_date, norms_version=norms.version)
+
+                async with self._graph_session(initial_state, pdf_path) as (graph, graph_input, config):
+                    async for mode, chunk in graph.astream(graph_input, stream_mode=["updates", "custom"], **config):
+                        if mode == "custom":
+                            section = chunk.get("section")
+                            if section and partial is not None:
+                                partial = partial.model_copy(update={section: chunk["content"]})
+                                publish(chunk["stage"], chunk["message"], render(partial))
+                            else:
+                                publish(chunk["stage"], chunk["message"])
+                            continue
+                        for node, update in chunk.items():
+                            update = update or {}
+                            if node == "map_subjects":
+                                subjects_json = update.get("subjects_json", "")
+                                metrics = score_subjects(json.loads(subjects_json or "[]"), grade)
+                                dashboard, key_findings = build_dashboard(metrics, subjects_json)
+                                partial = AssessmentReport(
+                                    key_findings=key_findings, overview=PENDING_SECTION_HTML,
+                                    performance_dashboard=dashboard, summary=PENDING_SECTION_HTML,
+                                )
+                                first_content = time.perf_counter() - started
+                                publish(node, f"📊 Metrics ready for {len(dashboard.table_rows)} subjects", render(partial))
+                            elif node == "synthesis":
+                                total = time.perf_counter() - started
+                                print(f"--- Time to first useful content: {first_content or total:.2f}s, full report: {total:.2f}s ---")
+                                publish(node, f"✅ Report ready in {total:.1f}s", update["messages"][-1].content, final=True)
+                                finished = True
+                            elif node in ("execute_tools", "compute_metrics"):
+                                publish(node, "🧮 Benchmark metrics calculated")
+                    if not finished and graph is not self.graph:
+                        # A checkpointed run that had already completed streams nothing; serve its stored report
+                        saved = (await graph.aget_state(config["config"])).values
+                        if _has_report(saved):
+                            publish("synthesis", "✅ Report restored from checkpoint", saved["messages"][-1].content, final=True)
+                            finished = True
+                if not finished:
+                    # The graph ended early (no subjects found in the PDF)
+                    publish("user_input_parser", "No subjects could be extracted from the PDF.", final=True)
+
+        try:
+            await produce()
+        finally:
+            shared.close()
+
+# --- Shared Agent ---
+_shared_assessment: Optional[StudentAssessment] = None
+_shared_assessment_lock = asyncio.Lock()
+
+
+async def get_student_assessment() -> StudentAssessment:
+    """
+    Returns the process-wide StudentAssessment, compiling its graph on first use.
+    The compiled graph and LLM runnables hold no per-request data (that lives only in
+    AgentState), so one instance serves any number of concurrent runs.
+    """
+    global _shared_assessment
+    if _shared_assessment is None:
+        async with _shared_assessment_lock:
+            if _shared_assessment is None:
+                assessment = StudentAssessment()
+                await assessment.setup_graph()
+                _shared_assessment = assessment
+    return _shared_assessment
+
 # --- Main Function ---
 async def main():
     """Main function to run the agent from the command line for testing."""
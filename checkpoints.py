@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import aiosqlite
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from pdf_parser import PDF_EXECUTOR, PDFSource
+from sqlite_cache import CACHE_DIR
+from user_input_parser import pdf_cache_key
+
+# Graph checkpoints of assessment runs, so a failed or cancelled run resumes from its last completed node
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, "checkpoints.sqlite")
+# Runs (finished or abandoned) are deleted this long after their last activity
+CHECKPOINT_RETENTION_SECONDS = float(os.getenv("CHECKPOINT_RETENTION_HOURS", "24")) * 3600
+# A run still marked 'running' after this long is taken to have crashed, and may be resumed
+RUN_STALE_SECONDS = float(os.getenv("CHECKPOINT_RUN_STALE_MINUTES", "15")) * 60
+# Pruning runs at most this often, at the start of a run
+_PRUNE_INTERVAL_SECONDS = 600
+_last_prune: Dict[str, float] = {}
+
+# Pydantic models stored in AgentState; the checkpoint serializer only restores allow-listed types
+_STATE_TYPES = [("build_graph", "SubjectMetrics"), ("user_input_parser", "SubjectPerformance")]
+
+
+def run_id(pdf_source: PDFSource, grade: str, student_name: str, assessment_mode: str) -> str:
+    """Checkpoint thread ID of a run: a hash of the PDF content (and parser version), grade, student name and assessment mode."""
+    key = json.dumps([pdf_cache_key(pdf_source), str(grade).strip(), str(student_name).strip(), assessment_mode])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class RunCheckpoints:
+    """
+    AsyncSqliteSaver for the assessment graph, plus a run table recording when each
+    run was last active so that old runs can be pruned after the retention window.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, path: str, retention_seconds: float = CHECKPOINT_RETENTION_SECONDS):
+        self.conn = conn
+        self.path = path
+        self.saver = AsyncSqliteSaver(conn, serde=JsonPlusSerializer(allowed_msgpack_modules=_STATE_TYPES))
+        self.retention_seconds = retention_seconds
+
+    async def setup(self) -> None:
+        # WAL lets concurrent runs read while another one writes its checkpoint
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.saver.setup()
+        await self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS assessment_runs ("
+            "run_id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        await self.conn.commit()
+
+    async def run_id(self, pdf_source: PDFSource, grade: str, student_name: str, assessment_mode: str) -> str:
+        """run_id, hashing the PDF on the bounded PDF executor."""
+        return await asyncio.get_running_loop().run_in_executor(
+            PDF_EXECUTOR, run_id, pdf_source, grade, student_name, assessment_mode
+        )
+
+    async def is_running(self, run_id: str) -> bool:
+        """Whether the run is in progress elsewhere: marked 'running' and active within RUN_STALE_SECONDS."""
+        async with self.conn.execute(
+            "SELECT 1 FROM assessment_runs WHERE run_id = ? AND status = 'running' AND updated_at >= ?",
+            (run_id, time.time() - RUN_STALE_SECONDS),
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+    async def mark(self, run_id: str, status: str) -> None:
+        """Records a run as 'running', 'failed' or 'completed' (now); completed runs keep only their final checkpoint."""
+        await self.conn.execute(
+            "INSERT INTO assessment_runs (run_id, status, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(run_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+            (run_id, status, time.time()),
+        )
+        if status == "completed":
+            await self._keep_latest(run_id)
+        await self.conn.commit()
+
+    async def _keep_latest(self, run_id: str) -> None:
+        """
+        Drops all but the run's final checkpoint. The SQLite saver stores every channel
+        value in every checkpoint row (and does not implement aprune), so this is done on
+        its tables directly; checkpoint IDs sort in creation order.
+        """
+        latest = "(SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '')"
+        for table in ("checkpoints", "writes"):
+            await self.conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id <> {latest}", (run_id, run_id)
+            )
+
+    async def forget(self, run_id: str) -> None:
+        """Deletes a run's checkpoints, so it starts over."""
+        await self.saver.adelete_thread(run_id)
+        await self.conn.execute("DELETE FROM assessment_runs WHERE run_id = ?", (run_id,))
+        await self.conn.commit()
+
+    async def prune(self, force: bool = False) -> int:
+        """Deletes runs inactive for longer than the retention window. Returns the number deleted."""
+        now = time.time()
+        if not force and now - _last_prune.get(self.path, 0.0) < _PRUNE_INTERVAL_SECONDS:
+            return 0
+        _last_prune[self.path] = now
+        async with self.conn.execute(
+            "SELECT run_id FROM assessment_runs WHERE updated_at < ?", (now - self.retention_seconds,)
+        ) as cursor:
+            expired = [row[0] for row in await cursor.fetchall()]
+        for expired_id in expired:
+            await self.forget(expired_id)
+        if expired:
+            print(f"--- Pruned {len(expired)} checkpointed runs older than {self.retention_seconds / 3600:g}h ---")
+        return len(expired)
+
+
+@asynccontextmanager
+async def open_run_checkpoints(path: Optional[str] = None) -> AsyncIterator[RunCheckpoints]:
+    """Opens the checkpoint database for one run (each run uses its own connection, closed on exit)."""
+    path = path or CHECKPOINT_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with aiosqlite.connect(path, timeout=30) as conn:
+        checkpoints = RunCheckpoints(conn, path)
+        await checkpoints.setup()
+        yield checkpoints
@@ -0,0 +1,203 @@
+import os
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from grade_reader import grade_sort_key
+from tools import calculate_metrics_batch
+
+# Columns of the cohort results table (one row per student and subject)
+COHORT_COLUMNS = ["student_name", "grade", "subject", "score"]
+
+ABOVE_GRADE_LEVEL = "Above Grade Level"
+ON_GRADE_LEVEL = "On Grade Level"
+BELOW_GRADE_LEVEL = "Below Grade Level"
+NO_DATA = "No Data"
+
+# Percentile bands used throughout the reports (see README "Percentile Bands")
+PERCENTILE_BANDS = [
+    (90, "🎉 90-100th"),
+    (80, "⭐ 80-89th"),
+    (70, "🏆 70-79th"),
+    (60, "👍 60-69th"),
+    (50, "📈 50-59th"),
+    (40, "💪 40-49th"),
+    (30, "📚 30-39th"),
+    (20, "🔧 20-29th"),
+    (10, "💡 10-19th"),
+    (1, "🌱 1-9th"),
+    (0, "Below 1st"),
+]
+
+
+def records_from_subjects(student_name: str, grade: str, subjects: Iterable) -> List[dict]:
+    """
+    Converts one student's mapped subjects (dicts from subjects_json or SubjectPerformance
+    objects with official subject names) into cohort table rows.
+    """
+    records = []
+    for s in subjects:
+        subject = s["subject"] if isinstance(s, dict) else s.subject
+        score = s["score"] if isinstance(s, dict) else s.score
+        records.append({"student_name": student_name, "grade": str(grade), "subject": subject, "score": int(score)})
+    return records
+
+
+def build_cohort_table(records: Iterable[dict]) -> pd.DataFrame:
+    """Builds the columnar cohort table from row dicts with COHORT_COLUMNS keys."""
+    df = pd.DataFrame.from_records(list(records), columns=COHORT_COLUMNS)
+    return _normalize(df)
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Enforces the cohort column types; categoricals keep repeated names compact."""
+    missing = [c for c in COHORT_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Cohort table is missing columns: {missing}")
+    df = df[COHORT_COLUMNS].copy()
+    df["student_name"] = df["student_name"].astype(str).astype("category")
+    df["grade"] = df["grade"].astype(str).astype("category")
+    df["subject"] = df["subject"].astype(str).astype("category")
+    df["score"] = pd.to_numeric(df["score"], errors="coerce").fillna(0).astype(np.int64)
+    return df
+
+
+def save_cohort(df: pd.DataFrame, path: str) -> str:
+    """Writes a cohort table (raw or scored) to Parquet."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+    return path
+
+
+def load_cohort(path: str) -> pd.DataFrame:
+    """Loads a cohort table from Parquet (or CSV with COHORT_COLUMNS headers)."""
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return _normalize(pd.read_csv(path, dtype={"grade": str}))
+
+    import pyarrow.parquet as pq
+
+    return _normalize(pq.read_table(path, columns=COHORT_COLUMNS).to_pandas())
+
+
+def _grade_numbers(labels: pd.Series) -> np.ndarray:
+    """Numeric grade (K = 0) for each label, NaN where the label is not a grade."""
+    lookup = {}
+    for label in pd.unique(labels.dropna()):
+        number = grade_sort_key(label)
+        lookup[label] = float(number) if number != 99 else np.nan
+    return labels.map(lookup).astype(float).to_numpy()
+
+
+def score_cohort(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Scores every row of a cohort table against the benchmark norms in one vectorized call.
+
+    Adds percentile, performing_grade, next_grade_threshold and grade_level_band
+    (Above / On / Below Grade Level, or No Data) columns.
+    """
+    metrics = calculate_metrics_batch(df["subject"].astype(str), df["score"].to_numpy(), df["grade"].astype(str))
+
+    scored = df.copy()
+    scored["percentile"] = metrics["Percentile"].to_numpy()
+    scored["performing_grade"] = metrics["PerformingGrade"].to_numpy()
+    scored["next_grade_threshold"] = metrics["NextGradeThreshold"].to_numpy()
+
+    student_grade = _grade_numbers(scored["grade"].astype(str))
+    performing_grade = _grade_numbers(scored["performing_grade"])
+    band = np.select(
+        [performing_grade > student_grade, performing_grade == student_grade, performing_grade < student_grade],
+        [ABOVE_GRADE_LEVEL, ON_GRADE_LEVEL, BELOW_GRADE_LEVEL],
+        default=NO_DATA,
+    )
+    scored["grade_level_band"] = pd.Categorical(
+        band, categories=[ABOVE_GRADE_LEVEL, ON_GRADE_LEVEL, BELOW_GRADE_LEVEL, NO_DATA]
+    )
+    scored.attrs["norms_version"] = metrics.attrs.get("norms_version", "")
+    return scored
+
+
+def percentile_band_labels(percentiles: pd.Series) -> pd.Categorical:
+    """Maps percentiles to the report's percentile band labels."""
+    thresholds = np.array([t for t, _ in PERCENTILE_BANDS])
+    labels = [label for _, label in PERCENTILE_BANDS]
+    positions = np.searchsorted(-thresholds, -percentiles.to_numpy(), side="left")
+    return pd.Categorical.from_codes(np.minimum(positions, len(labels) - 1), categories=labels)
+
+
+def percentile_band_label(percentile: int) -> str:
+    """The report's percentile band label for a single percentile."""
+    for threshold, label in PERCENTILE_BANDS:
+        if percentile >= threshold:
+            return label
+    return PERCENTILE_BANDS[-1][1]
+
+
+def cohort_summary(scored: pd.DataFrame) -> dict:
+    """
+    Class-level statistics for a scored cohort table.
+
+    Returns a dict with:
+    - subjects: per-subject score and percentile distribution
+    - grade_level_counts: at/below/above grade level counts per subject
+    - percentile_distribution: percentile band counts per subject
+    - students, rows, norms_version
+    """
+    has_data = scored[scored["percentile"] >= 0]
+    by_subject = has_data.groupby("subject", observed=True)
+
+    subjects = by_subject.agg(
+        students=("student_name", "nunique"),
+        mean_score=("score", "mean"),
+        median_score=("score", "median"),
+        min_score=("score", "min"),
+        max_score=("score", "max"),
+        mean_percentile=("percentile", "mean"),
+        median_percentile=("percentile", "median"),
+    ).round(1)
+
+    grade_level_counts = pd.crosstab(scored["subject"], scored["grade_level_band"], dropna=False)
+    grade_level_counts = grade_level_counts.reindex(
+        columns=[ABOVE_GRADE_LEVEL, ON_GRADE_LEVEL, BELOW_GRADE_LEVEL, NO_DATA], fill_value=0
+    )
+
+    percentile_distribution = pd.crosstab(
+        has_data["subject"], percentile_band_labels(has_data["percentile"]), colnames=["percentile_band"], dropna=False
+    )
+
+    return {
+        "subjects": subjects,
+        "grade_level_counts": grade_level_counts,
+        "percentile_distribution": percentile_distribution,
+        "students": int(scored["student_name"].nunique()),
+        "rows": int(len(scored)),
+        "norms_version": scored.attrs.get("norms_version", ""),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Scores a cohort file and writes the scored Parquet table and an HTML summary next to it."""
+    import argparse
+    from datetime import datetime
+    from report_formatter import format_cohort_report
+
+    parser = argparse.ArgumentParser(description="Score a cohort of IXL diagnostic results against the EOY norms.")
+    parser.add_argument("path", help="Cohort table (.parquet or .csv) with columns: " + ", ".join(COHORT_COLUMNS))
+    parser.add_argument("--title", default="Cohort Assessment Summary")
+    args = parser.parse_args(argv)
+
+    scored = score_cohort(load_cohort(args.path))
+    summary = cohort_summary(scored)
+
+    base = os.path.splitext(args.path)[0]
+    save_cohort(scored, f"{base}_scored.parquet")
+    html = format_cohort_report(summary, args.title, datetime.now().strftime("%B %d, %Y"))
+    with open(f"{base}_cohort_report.html", "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"Scored {summary['rows']} rows for {summary['students']} students -> {base}_scored.parquet, {base}_cohort_report.html")
+
+
+if __name__ == "__main__":
+    main()
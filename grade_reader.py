@@ -1,8 +1,34 @@
-import pandas as pd
+import numpy as np
 import os
 import json
+import hashlib
+import mmap
+import struct
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from types import MappingProxyType
+import tempfile
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
 
-def get_grade_data() -> pd.DataFrame:
+if TYPE_CHECKING:
+    import pandas as pd
+
+EOY_DATA_PATH = os.path.join("assets", "EOY_Grade_levels.json")
+
+
+def _load_eoy_data(file_path: str = EOY_DATA_PATH) -> list:
+    """Reads the raw list of subject tables from the EOY benchmark JSON file."""
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"The file {file_path} was not found.")
+    except json.JSONDecodeError:
+        raise ValueError(f"Could not decode JSON from {file_path}.")
+
+
+def get_grade_data() -> "pd.DataFrame":
     """
     Loads the EOY_Grade_levels.json file, processes it from its nested
     JSON structure into a single, tidy Pandas DataFrame, and returns it.
@@ -16,15 +42,10 @@ def get_grade_data() -> pd.DataFrame:
     - Grade
     - Score
     """
-    file_path = os.path.join("assets", "EOY_Grade_levels.json")
-    
-    try:
-        with open(file_path, 'r') as f:
-            eoy_data = json.load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError(f"The file {file_path} was not found.")
-    except json.JSONDecodeError:
-        raise ValueError(f"Could not decode JSON from {file_path}.")
+    # Imported lazily: the BenchmarkIndex path used by the tools never needs pandas
+    import pandas as pd
+
+    eoy_data = _load_eoy_data()
 
     all_subject_data = []
     
@@ -64,3 +85,525 @@ def get_grade_data() -> pd.DataFrame:
     # print (combined_df)
     return combined_df
 
+
+
+def grade_sort_key(grade: str) -> int:
+    """Orders grade labels as K, 1, 2, ..., 12 (also accepts 'Grade 9' style labels)."""
+    label = str(grade).strip()
+    if label.upper() == 'K':
+        return 0
+    digits = ''.join(ch for ch in label if ch.isdigit())
+    return int(digits) if digits else 99
+
+
+def grade_key(grade) -> object:
+    """
+    Canonical form of a grade label for lookups, so that '10', 'Grade 10' and ' 10 '
+    all name the same norms column. Labels that are not grades are kept as given.
+    """
+    number = grade_sort_key(grade)
+    return number if number != 99 else str(grade).strip()
+
+
+def _eoy_data_to_matrix(eoy_data: list) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """
+    Flattens the EOY subject tables into (subjects, grades, percentiles, scores), where
+    scores has shape (subjects, grades, percentiles) and -1 marks a missing benchmark.
+    Missing values inside a table are treated as 0, as in get_grade_data().
+    """
+    tables = [t for t in eoy_data if t.get('data')]
+    if not tables:
+        raise ValueError("JSON data is empty or in an unexpected format.")
+
+    subjects: List[str] = []
+    for table in tables:
+        title = table.get('title', 'Unknown Subject')
+        if title not in subjects:
+            subjects.append(title)
+    grades = sorted(
+        {str(k) for t in tables for row in t['data'] for k in row if k != 'Percentile'},
+        key=grade_sort_key,
+    )
+    percentiles = np.array(sorted({int(row['Percentile']) for t in tables for row in t['data']}), dtype=np.int64)
+
+    subject_pos = {s: i for i, s in enumerate(subjects)}
+    grade_pos = {g: i for i, g in enumerate(grades)}
+    percentile_pos = {int(p): i for i, p in enumerate(percentiles)}
+    scores = np.full((len(subjects), len(grades), len(percentiles)), -1, dtype=np.int64)
+    for table in tables:
+        s = subject_pos[table.get('title', 'Unknown Subject')]
+        for row in table['data']:
+            p = percentile_pos[int(row['Percentile'])]
+            for grade, raw_score in row.items():
+                if grade == 'Percentile':
+                    continue
+                scores[s, grade_pos[str(grade)], p] = int(raw_score) if raw_score is not None else 0
+    return subjects, grades, percentiles, scores
+
+
+# Percentile used as the "on grade level" benchmark (performing grade and next grade threshold)
+BENCHMARK_PERCENTILE = 70
+
+
+class BenchmarkIndex:
+    """
+    Immutable, in-memory index over the EOY benchmark norms.
+
+    Built once per process from the compiled norms file (see load_benchmark_index)
+    so that tools can answer lookups with dict access instead of re-running
+    the pandas pipeline in get_grade_data() on every call.
+
+    The raw score matrix is kept as given; when loaded from the compiled norms
+    file it is a read-only view onto a shared memory map.
+
+    Alongside the dict lookups the index keeps NumPy arrays laid out for
+    np.searchsorted, so many (subject, score, grade) rows can be scored in
+    one vectorized call:
+    - one row per (subject, grade) of scores across percentiles, and
+    - one row per subject of BENCHMARK_PERCENTILE scores across grades.
+
+    Scores follow the same cleaning rules as get_grade_data(): missing
+    benchmark values are treated as 0.
+    """
+
+    __slots__ = (
+        "subjects", "percentiles", "version", "_by_subject_grade", "_by_subject_percentile",
+        "_scores", "_pair_cells", "_pair_ids", "_subject_ids", "_percentile_search",
+        "_benchmark_search", "_benchmark_grades", "_benchmark_lengths", "_search_span",
+    )
+
+    def __init__(self, subjects, grades, percentiles, scores, version: str = ""):
+        """
+        Args:
+            subjects: Official subject titles, in source order.
+            grades: Grade labels (e.g., 'K', '1', 'Grade 9'); lookups accept any label with
+                the same grade_key (e.g., '9' for 'Grade 9').
+            percentiles: Percentile values, ascending.
+            scores: Integer array of shape (subjects, grades, percentiles) with
+                -1 wherever the norms have no benchmark (e.g., a K-8 subject in grade 9).
+            version: Identifier of the source norms (see norms_version), recorded in reports.
+        """
+        if not len(subjects):
+            raise ValueError("JSON data is empty or in an unexpected format.")
+
+        # Keyed by grade_key, so a student's bare grade ('10') finds labelled norms columns ('Grade 10')
+        by_subject_grade: Dict[Tuple[str, object], Tuple[Tuple[int, int], ...]] = {}
+        by_subject_percentile: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
+        pair_cells: List[Tuple[int, int]] = []
+        grade_order = sorted(range(len(grades)), key=lambda g: grade_sort_key(grades[g]))
+
+        for s, subject_title in enumerate(subjects):
+            for g in grade_order:
+                column = scores[s, g]
+                present = [(int(percentiles[p]), int(column[p])) for p in range(len(percentiles)) if column[p] >= 0]
+                if not present:
+                    continue
+                by_subject_grade[(subject_title, grade_key(grades[g]))] = tuple(present)
+                pair_cells.append((s, g))
+                for percentile, score in present:
+                    by_subject_percentile.setdefault((subject_title, percentile), []).append((str(grades[g]), score))
+
+        object.__setattr__(self, "subjects", tuple(subjects))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "percentiles", np.array(percentiles, dtype=np.int64))
+        object.__setattr__(self, "_scores", scores)
+        object.__setattr__(self, "_pair_cells", np.array(pair_cells, dtype=np.int64).reshape(-1, 2))
+        object.__setattr__(self, "_by_subject_grade", MappingProxyType(by_subject_grade))
+        object.__setattr__(self, "_by_subject_percentile", MappingProxyType({
+            key: tuple(values) for key, values in by_subject_percentile.items()
+        }))
+        self._build_search_arrays()
+
+    @classmethod
+    def from_eoy_data(cls, eoy_data: list, version: str = "") -> "BenchmarkIndex":
+        """Builds the index from the parsed EOY_Grade_levels.json list of subject tables."""
+        subjects, grades, percentiles, scores = _eoy_data_to_matrix(eoy_data)
+        return cls(subjects, grades, percentiles, scores, version=version)
+
+    def _build_search_arrays(self) -> None:
+        """Lays the norms out as sorted NumPy rows for batched np.searchsorted lookups."""
+        pairs = list(self._by_subject_grade)
+
+        # Benchmark scores, one row per (subject, grade); -1 marks a missing percentile row
+        grade_scores = np.asarray(self._scores[self._pair_cells[:, 0], self._pair_cells[:, 1]], dtype=np.int64)
+
+        benchmark_rows = [self._by_subject_percentile.get((s, BENCHMARK_PERCENTILE), ()) for s in self.subjects]
+        max_score = max(int(grade_scores.max()), max((score for r in benchmark_rows for _, score in r), default=0))
+        # Every row is shifted into its own [row * span, (row + 1) * span) band, so one
+        # searchsorted over the flattened matrix answers all rows at once.
+        span = max_score + 3
+        never = max_score + 2
+
+        # "Highest percentile with benchmark <= score" == searchsorted over the suffix minimum
+        shifted = np.where(grade_scores < 0, never, grade_scores + 1)
+        suffix_min = np.minimum.accumulate(shifted[:, ::-1], axis=1)[:, ::-1]
+        percentile_search = (suffix_min + np.arange(len(pairs))[:, None] * span).ravel()
+
+        # "Highest grade reached before the first missed benchmark" == searchsorted over the prefix maximum
+        width = max((len(r) for r in benchmark_rows), default=0)
+        benchmark_search = np.full((len(self.subjects), width), never, dtype=np.int64)
+        benchmark_grades = np.full((len(self.subjects), width), None, dtype=object)
+        for row, values in enumerate(benchmark_rows):
+            if values:
+                benchmark_search[row, :len(values)] = np.maximum.accumulate([score + 1 for _, score in values])
+                benchmark_grades[row, :len(values)] = [grade for grade, _ in values]
+        benchmark_search = (benchmark_search + np.arange(len(self.subjects))[:, None] * span).ravel()
+        benchmark_lengths = np.array([len(r) for r in benchmark_rows], dtype=np.int64)
+
+        for array in (self.percentiles, self._pair_cells, percentile_search, benchmark_search, benchmark_grades, benchmark_lengths):
+            array.setflags(write=False)
+
+        object.__setattr__(self, "_pair_ids", MappingProxyType({key: i for i, key in enumerate(pairs)}))
+        object.__setattr__(self, "_subject_ids", MappingProxyType({s: i for i, s in enumerate(self.subjects)}))
+        object.__setattr__(self, "_percentile_search", percentile_search)
+        object.__setattr__(self, "_benchmark_search", benchmark_search)
+        object.__setattr__(self, "_benchmark_grades", benchmark_grades)
+        object.__setattr__(self, "_benchmark_lengths", benchmark_lengths)
+        object.__setattr__(self, "_search_span", span)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BenchmarkIndex is immutable")
+
+    def scores_for_grade(self, subject: str, grade: str) -> Tuple[Tuple[int, int], ...]:
+        """Returns (percentile, score) pairs for a subject and grade, sorted by percentile."""
+        return self._by_subject_grade.get((subject, grade_key(grade)), ())
+
+    def scores_for_percentile(self, subject: str, percentile: int) -> Tuple[Tuple[str, int], ...]:
+        """Returns (grade, score) pairs for a subject at one percentile, ordered K, 1, 2, ..."""
+        return self._by_subject_percentile.get((subject, int(percentile)), ())
+
+    def score(self, subject: str, grade: str, percentile: int) -> Optional[int]:
+        """Returns the benchmark score for a subject, grade and percentile, or None if absent."""
+        for row_percentile, score in self.scores_for_grade(subject, grade):
+            if row_percentile == int(percentile):
+                return score
+        return None
+
+    # --- Vectorized lookups ---
+
+    def pair_ids(self, subjects, grades) -> np.ndarray:
+        """Maps (subject, grade) rows to internal row ids; -1 where there is no benchmark data."""
+        return np.fromiter(
+            (self._pair_ids.get((s, grade_key(g)), -1) for s, g in zip(subjects, grades)),
+            dtype=np.int64, count=len(subjects),
+        )
+
+    def subject_ids(self, subjects) -> np.ndarray:
+        """Maps subject names to internal subject ids; -1 for unknown subjects."""
+        return np.fromiter((self._subject_ids.get(s, -1) for s in subjects), dtype=np.int64, count=len(subjects))
+
+    def batch_percentiles(self, pair_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """
+        Highest percentile whose benchmark each score meets, 0 if none, -1 where pair_id is -1.
+        """
+        width = len(self.percentiles)
+        valid = pair_ids >= 0
+        rows = np.where(valid, pair_ids, 0)
+        queries = rows * self._search_span + np.clip(scores + 1, 0, self._search_span - 2)
+        reached = np.searchsorted(self._percentile_search, queries, side='right') - rows * width
+        result = np.where(reached > 0, self.percentiles[np.maximum(reached - 1, 0)], 0)
+        return np.where(valid, result, -1)
+
+    def batch_benchmark_scores(self, pair_ids: np.ndarray, percentile: int = BENCHMARK_PERCENTILE) -> np.ndarray:
+        """Benchmark score at `percentile` for each (subject, grade) row, -1 where unavailable."""
+        matches = np.flatnonzero(self.percentiles == percentile)
+        if matches.size == 0:
+            return np.full(len(pair_ids), -1, dtype=np.int64)
+        valid = pair_ids >= 0
+        cells = self._pair_cells[np.where(valid, pair_ids, 0)]
+        result = np.asarray(self._scores[cells[:, 0], cells[:, 1], matches[0]], dtype=np.int64)
+        return np.where(valid, result, -1)
+
+    def batch_has_benchmark(self, subject_ids: np.ndarray) -> np.ndarray:
+        """Whether each subject has BENCHMARK_PERCENTILE data for at least one grade."""
+        return (subject_ids >= 0) & (self._benchmark_lengths[np.maximum(subject_ids, 0)] > 0)
+
+    def batch_performing_grades(self, subject_ids: np.ndarray, scores: np.ndarray) -> np.ndarray:
+        """
+        Highest grade reached at BENCHMARK_PERCENTILE, walking up from K and stopping at the
+        first grade whose benchmark the score misses. None where no grade is reached or the
+        subject has no BENCHMARK_PERCENTILE data.
+        """
+        width = self._benchmark_grades.shape[1]
+        valid = subject_ids >= 0
+        rows = np.where(valid, subject_ids, 0)
+        queries = rows * self._search_span + np.clip(scores + 1, 0, self._search_span - 2)
+        reached = np.searchsorted(self._benchmark_search, queries, side='right') - rows * width
+        result = np.full(len(subject_ids), None, dtype=object)
+        hit = valid & (reached > 0)
+        result[hit] = self._benchmark_grades[rows[hit], reached[hit] - 1]
+        return result
+
+
+# --- Compiled norms file ---
+#
+# Fixed little-endian layout, so every worker can mmap the same file read-only and
+# share one page-cache copy instead of each parsing the JSON:
+#   header   : magic (8s) | sha256 of source JSON (32s) | n_subjects, n_grades,
+#              n_percentiles (3 x uint16) | labels_size (uint32) | pad (2x)
+#   labels   : UTF-8 subject titles then grade labels, newline separated, padded to 2 bytes
+#   percentiles : int16[n_percentiles]
+#   scores   : int16[n_subjects, n_grades, n_percentiles], -1 where no benchmark exists
+NORMS_BIN_PATH = os.path.join("assets", "EOY_Grade_levels.norms.bin")
+_NORMS_MAGIC = b"EOYNORM1"
+_NORMS_HEADER = struct.Struct("<8s32sHHHIxx")
+
+
+def _source_digest(source_path: str) -> bytes:
+    """SHA-256 of the raw benchmark JSON, used to key the compiled norms file."""
+    try:
+        with open(source_path, 'rb') as f:
+            return hashlib.sha256(f.read()).digest()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"The file {source_path} was not found.")
+
+
+def norms_version(digest: bytes) -> str:
+    """Short, human-readable norms version derived from the source JSON hash."""
+    return digest.hex()[:12]
+
+
+def compile_norms(source_path: str = EOY_DATA_PATH, output_path: str = NORMS_BIN_PATH) -> str:
+    """
+    Compiles the benchmark JSON into the fixed-layout binary norms file.
+
+    The file is written to a temporary name and moved into place with os.replace,
+    so concurrent workers never map a half-written file.
+
+    Returns:
+        The path of the compiled file.
+    """
+    digest = _source_digest(source_path)
+    subjects, grades, percentiles, scores = _eoy_data_to_matrix(_load_eoy_data(source_path))
+    int16 = np.iinfo(np.int16)
+    if scores.min() < int16.min or scores.max() > int16.max or percentiles.max() > int16.max:
+        raise ValueError(f"Benchmark values in {source_path} do not fit the int16 norms layout.")
+
+    labels = "\n".join(list(subjects) + list(grades)).encode("utf-8")
+    labels += b"\0" * (len(labels) % 2)
+    header = _NORMS_HEADER.pack(_NORMS_MAGIC, digest, len(subjects), len(grades), len(percentiles), len(labels))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(labels)
+            f.write(percentiles.astype('<i2').tobytes())
+            f.write(scores.astype('<i2').tobytes())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return output_path
+
+
+def _map_norms(norms_path: str, digest: bytes) -> Optional[BenchmarkIndex]:
+    """
+    Memory-maps a compiled norms file read-only and builds the index over it.
+    Returns None if the file is missing, malformed, or was built from different JSON.
+    """
+    try:
+        with open(norms_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    valid = len(buffer) >= _NORMS_HEADER.size
+    if valid:
+        magic, file_digest, n_subjects, n_grades, n_percentiles, labels_size = _NORMS_HEADER.unpack_from(buffer, 0)
+        expected_size = _NORMS_HEADER.size + labels_size + 2 * (n_percentiles + n_subjects * n_grades * n_percentiles)
+        valid = magic == _NORMS_MAGIC and file_digest == digest and len(buffer) == expected_size
+    if not valid:
+        buffer.close()
+        return None
+
+    offset = _NORMS_HEADER.size
+    labels = bytes(buffer[offset:offset + labels_size]).rstrip(b"\0").decode("utf-8").split("\n")
+    offset += labels_size
+    percentiles = np.frombuffer(buffer, dtype='<i2', count=n_percentiles, offset=offset)
+    offset += percentiles.nbytes
+    scores = np.frombuffer(buffer, dtype='<i2', count=n_subjects * n_grades * n_percentiles, offset=offset)
+    scores = scores.reshape(n_subjects, n_grades, n_percentiles)
+    return BenchmarkIndex(labels[:n_subjects], labels[n_subjects:], percentiles, scores, version=norms_version(digest))
+
+
+def load_benchmark_index(source_path: str = EOY_DATA_PATH, norms_path: str = NORMS_BIN_PATH) -> BenchmarkIndex:
+    """
+    Loads the BenchmarkIndex from the compiled norms file, recompiling it first when
+    it is missing or its hash does not match the source JSON. Falls back to building
+    the index straight from the JSON if the compiled file cannot be written.
+    """
+    digest = _source_digest(source_path)
+    index = _map_norms(norms_path, digest)
+    if index is not None:
+        return index
+
+    try:
+        compile_norms(source_path, norms_path)
+    except OSError as e:
+        print(f"--- Could not write compiled norms to {norms_path}: {e} ---")
+        return BenchmarkIndex.from_eoy_data(_load_eoy_data(source_path), version=norms_version(digest))
+
+    index = _map_norms(norms_path, digest)
+    if index is None:
+        # Source changed while compiling; build from the JSON we can read now
+        digest = _source_digest(source_path)
+        return BenchmarkIndex.from_eoy_data(_load_eoy_data(source_path), version=norms_version(digest))
+    return index
+
+
+def validate_benchmark_index(index: BenchmarkIndex) -> None:
+    """
+    Sanity-checks a freshly built index before it is allowed to replace the live one.
+
+    Raises:
+        ValueError: If the norms are unusable by the tools.
+    """
+    if not index.subjects:
+        raise ValueError("Benchmark norms contain no subjects.")
+    if BENCHMARK_PERCENTILE not in index.percentiles:
+        raise ValueError(f"Benchmark norms have no {BENCHMARK_PERCENTILE}th percentile row.")
+    for subject in index.subjects:
+        if not index.scores_for_percentile(subject, BENCHMARK_PERCENTILE):
+            raise ValueError(f"Subject '{subject}' has no {BENCHMARK_PERCENTILE}th percentile benchmarks.")
+    for (subject, grade), rows in index._by_subject_grade.items():
+        scores = [score for _, score in rows]
+        if any(later < earlier for earlier, later in zip(scores, scores[1:])):
+            raise ValueError(f"Benchmarks for '{subject}', grade {grade} decrease as the percentile rises.")
+
+
+# The live index. Readers take a reference once and keep using it, so swapping in a
+# new object never disturbs a calculation that is already running.
+_current_index: Optional[BenchmarkIndex] = None
+_index_lock = threading.Lock()
+# Index pinned for the current run (see pinned_benchmark_index); takes precedence over _current_index
+_pinned_index: ContextVar[Optional[BenchmarkIndex]] = ContextVar("pinned_benchmark_index", default=None)
+
+
+def get_benchmark_index() -> BenchmarkIndex:
+    """
+    Returns the BenchmarkIndex to use: the one pinned for the current run if any,
+    otherwise the process-wide index, memory-mapping the compiled norms file on
+    first use (see load_benchmark_index).
+    """
+    global _current_index
+    pinned = _pinned_index.get()
+    if pinned is not None:
+        return pinned
+    index = _current_index
+    if index is None:
+        with _index_lock:
+            if _current_index is None:
+                _current_index = load_benchmark_index()
+            index = _current_index
+    return index
+
+
+@contextmanager
+def pinned_benchmark_index(index: Optional[BenchmarkIndex] = None):
+    """
+    Pins one norms snapshot for everything run inside the block (including graph
+    nodes and tools executed in copied contexts), so a hot reload mid-run cannot
+    mix two norms versions in one report.
+    """
+    index = index or get_benchmark_index()
+    token = _pinned_index.set(index)
+    try:
+        yield index
+    finally:
+        _pinned_index.reset(token)
+
+
+def reload_benchmark_index(source_path: str = EOY_DATA_PATH, norms_path: str = NORMS_BIN_PATH) -> bool:
+    """
+    Rebuilds the index from source_path and atomically swaps it in if the norms changed
+    and the new index passes validate_benchmark_index.
+
+    Returns:
+        True if a new index was swapped in.
+    """
+    global _current_index
+    current = _current_index
+    if current is not None and current.version == norms_version(_source_digest(source_path)):
+        return False
+
+    index = load_benchmark_index(source_path, norms_path)
+    validate_benchmark_index(index)
+    with _index_lock:
+        previous = _current_index
+        _current_index = index
+    print(f"--- Benchmark norms reloaded: {previous.version if previous else 'none'} -> {index.version} ---")
+    return True
+
+
+class NormsWatcher:
+    """
+    Polls the benchmark JSON and hot-reloads the index when it changes.
+
+    A change in mtime (or size) triggers a content-hash check; only a different hash
+    leads to a rebuild, which happens on the watcher thread. A norms file that fails to
+    load or validate is reported and the current index stays live.
+    """
+
+    def __init__(self, source_path: str = EOY_DATA_PATH, norms_path: str = NORMS_BIN_PATH, interval: float = 30.0):
+        self.source_path = source_path
+        self.norms_path = norms_path
+        self.interval = interval
+        self._last_stat: Optional[Tuple[int, int]] = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.source_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self) -> bool:
+        """Runs one poll. Returns True if a new index was swapped in."""
+        stat = self._stat()
+        if stat is None or stat == self._last_stat:
+            return False
+        self._last_stat = stat
+        try:
+            return reload_benchmark_index(self.source_path, self.norms_path)
+        except Exception as e:
+            print(f"--- Benchmark norms reload failed, keeping current norms: {e} ---")
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> "NormsWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="norms-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_watcher: Optional[NormsWatcher] = None
+
+
+def start_norms_watcher(interval: float = 30.0) -> NormsWatcher:
+    """Starts (once per process) the background watcher for EOY_Grade_levels.json."""
+    global _watcher
+    if _watcher is None:
+        get_benchmark_index()
+        _watcher = NormsWatcher(interval=interval)
+    return _watcher.start()
+
+
+if __name__ == "__main__":
+    path = compile_norms()
+    index = get_benchmark_index()
+    print(f"Compiled {len(index.subjects)} subjects to {path} (norms version {index.version})")
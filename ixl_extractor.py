@@ -0,0 +1,157 @@
+import re
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from pdf_parser import IXL_SCORE_BLOCKS, PDFSource, open_pdf
+from user_input_parser import SubjectPerformance
+
+# Subject names reported for each score block; strands are prefixed with their section's area
+OVERALL_SUBJECTS = {
+    "Overall math level": "Math: Overall",
+    "Overall language arts level": "ELA: Overall",
+    "Overall reading level": "ELA: Reading Level",
+}
+SECTION_AREAS = {
+    "Math strand levels and recommendations": "Math",
+    "Language arts strand levels and recommendations": "ELA",
+}
+
+_SCORE_TEXT = re.compile(r"^\d{1,4}$")
+_SKILL_COUNT = re.compile(r"^(\d+) recommended skills?$")
+_SKILL_LINK = ">>"
+# Headings and scores are set in larger type than the chart axis labels (~8pt)
+_MIN_HEADING_SIZE = 12.0
+_MIN_SCORE_SIZE = 10.0
+# IXL diagnostic levels run from 0 to 1300
+_MAX_SCORE = 1300
+
+
+class RuleBasedExtraction(BaseModel):
+    """Result of the layout-based IXL extractor."""
+    subjects: List[SubjectPerformance] = Field(default_factory=list)
+    confident: bool = Field(description="True when every expected score block was found and checks out.")
+    issues: List[str] = Field(default_factory=list, description="Why the extraction is not confident, if it isn't.")
+    page_count: int = Field(default=0, description="Number of pages read from the PDF.")
+
+
+class _Line(BaseModel):
+    page: int
+    x: float
+    y: float
+    size: float
+    color: int
+    text: str
+
+
+def _page_lines(page, page_number: int) -> List[_Line]:
+    """Flattens page.get_text('dict') into text lines, in reading order."""
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            if not spans:
+                continue
+            first = spans[0]
+            lines.append(_Line(
+                page=page_number,
+                x=first["bbox"][0],
+                y=first["bbox"][1],
+                size=max(s["size"] for s in spans),
+                color=first["color"],
+                text=" ".join(s["text"].strip() for s in spans),
+            ))
+    return sorted(lines, key=lambda l: (l.y, l.x))
+
+
+def extract_ixl_scores(source: PDFSource) -> RuleBasedExtraction:
+    """
+    Extracts subjects, scores and recommended skills from an IXL Diagnostic Action Plan
+    (a file path, or its content as bytes/memoryview) using PyMuPDF's span layout,
+    without any LLM call.
+
+    Each score block is a heading (e.g. 'Numbers & Operations') followed below by its
+    score, drawn in the heading's color and larger than the chart axis labels, then an
+    optional 'N recommended skills' line and one '... >>' line per skill.
+
+    The result is marked confident only if every expected block of each report section
+    was found with a plausible score and the stated number of skills.
+    """
+    issues: List[str] = []
+    try:
+        doc = open_pdf(source)
+        pages = [_page_lines(page, i) for i, page in enumerate(doc)]
+        doc.close()
+    except Exception as e:
+        return RuleBasedExtraction(confident=False, issues=[f"Could not read PDF layout: {e}"])
+
+    known_blocks = {block for blocks in IXL_SCORE_BLOCKS.values() for block in blocks}
+    subjects: List[SubjectPerformance] = []
+    seen_sections = set()
+    found_blocks = set()
+    area: Optional[str] = None
+
+    for lines in pages:
+        headings = [
+            (i, line) for i, line in enumerate(lines)
+            if line.size >= _MIN_HEADING_SIZE and (line.text in known_blocks or line.text in SECTION_AREAS)
+        ]
+        score_lines = [l for l in lines if _SCORE_TEXT.match(l.text) and l.size >= _MIN_SCORE_SIZE]
+
+        for h, (i, heading) in enumerate(headings):
+            if heading.text in SECTION_AREAS:
+                area = SECTION_AREAS[heading.text]
+                seen_sections.add(heading.text)
+                continue
+
+            block_end_y = headings[h + 1][1].y if h + 1 < len(headings) else float("inf")
+            if heading.text in OVERALL_SUBJECTS:
+                subject = OVERALL_SUBJECTS[heading.text]
+                # Overall levels sit above the strand section heading, so only the next heading bounds them
+            else:
+                subject = f"{area}: {heading.text}" if area else heading.text
+
+            # Score: nearest large number below the heading, preferring the heading's color
+            candidates = [l for l in score_lines if heading.y < l.y < block_end_y]
+            candidates.sort(key=lambda l: (l.color != heading.color, l.y - heading.y))
+            if not candidates:
+                issues.append(f"No score found for '{heading.text}'")
+                continue
+            score = int(candidates[0].text)
+            if not 0 <= score <= _MAX_SCORE:
+                issues.append(f"Implausible score {score} for '{heading.text}'")
+
+            # Skills: '... >>' lines between this heading and the next, joining wrapped lines
+            expected_skills = None
+            skills: List[str] = []
+            pending = ""
+            for line in lines[i + 1:]:
+                if line.y >= block_end_y:
+                    break
+                count = _SKILL_COUNT.match(line.text)
+                if count:
+                    expected_skills = int(count.group(1))
+                    continue
+                if line.size < _MIN_SCORE_SIZE or _SCORE_TEXT.match(line.text):
+                    continue
+                if _SKILL_LINK in line.text:
+                    skills.append(f"{pending} {line.text.split(_SKILL_LINK)[0]}".strip())
+                    pending = ""
+                elif expected_skills is not None:
+                    pending = f"{pending} {line.text}".strip()
+            if expected_skills is not None and expected_skills != len(skills):
+                issues.append(f"Expected {expected_skills} skills for '{heading.text}', found {len(skills)}")
+
+            found_blocks.add(heading.text)
+            subjects.append(SubjectPerformance(subject=subject, score=score, recommended_skills=skills))
+
+    # Overall levels can precede their section heading, so infer sections from the blocks too
+    for section, blocks in IXL_SCORE_BLOCKS.items():
+        if section in seen_sections or found_blocks.intersection(blocks):
+            missing = [b for b in blocks if b not in found_blocks]
+            if missing:
+                issues.append(f"Missing score blocks: {', '.join(missing)}")
+
+    if not subjects:
+        issues.append("No IXL score blocks found")
+    return RuleBasedExtraction(subjects=subjects, confident=not issues, issues=issues, page_count=len(pages))
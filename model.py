@@ -1,26 +1,110 @@
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from typing import Any, Callable, Dict, Sequence, Tuple
+import httpx
 import os
+import threading
+
+from rate_limiter import RateLimitedLLM
+
 load_dotenv(override=True)
 
+# Gemini model used by every node; part of the node-result cache key, so changing it invalidates cached results
+LLM_MODEL = "gemini-2.5-flash-preview-05-20"
+
+# HTTP connection pool of each shared client; kept-alive connections skip the TCP/TLS handshake on later calls
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+
+# Process-wide registry of LLM clients and the runnables bound to them, built once and shared by every request
+_registry: Dict[Tuple, Any] = {}
+_registry_lock = threading.RLock()  # re-entrant: bound runnables build the shared client inside the lock
+
+
+def _shared(key: Tuple, factory: Callable[[], Any]) -> Any:
+    """Returns the registry entry for key, creating it with factory on first use."""
+    instance = _registry.get(key)
+    if instance is None:
+        with _registry_lock:
+            instance = _registry.get(key)
+            if instance is None:
+                instance = _registry[key] = factory()
+    return instance
+
+
+class _PooledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport for both the sync and the async Gemini client, each with its own pool
+    limited to the LLM_* connection settings. langchain passes the same client args to
+    both clients, and passing a transport makes the SDK use httpx for async calls too:
+    with aiohttp installed it would otherwise use an aiohttp session whose pool cannot
+    be configured.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._sync = httpx.HTTPTransport(limits=limits)
+        self._async = httpx.AsyncHTTPTransport(limits=limits)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._sync.handle_request(request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._async.handle_async_request(request)
+
+    def close(self) -> None:
+        self._sync.close()
+
+    async def aclose(self) -> None:
+        await self._async.aclose()
+
+
+def _client_args() -> dict:
+    """Client args of the Gemini client: a pooled transport with the configured connection limits."""
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    )
+    return {"transport": _PooledTransport(limits)}
+
+
+def _chat_client() -> ChatGoogleGenerativeAI:
+    """
+    The shared Gemini client. SDK retries are disabled (one attempt per call) so that
+    throttled calls are retried by the rate limiter, which also adjusts its window.
+    """
+    return _shared(
+        ("client", LLM_MODEL),
+        lambda: ChatGoogleGenerativeAI(model=LLM_MODEL, max_retries=1, client_args=_client_args()),
+    )
+
 
 def get_llm_core():
     """
     Returns the LLM core model.
     This model is used for the core functionality of the application.
+    The client is created once per process and shared; calls go through the process-wide rate limiter.
     """
     #model = ChatOpenAI(model="gpt-4o-mini")
-    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
-    return model
+    return _shared(("chat", LLM_MODEL), lambda: RateLimitedLLM(_chat_client()))
 
 
 def get_extraction_llm():
     """
     Returns the LLM for subject extraction from PDF text.
-    This uses Gemini for better extraction results.
+    This uses Gemini for better extraction results; it shares the core model's client.
     """
-    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-05-20")
-    return model
+    return get_llm_core()
+
+
+def get_structured_llm(schema: type):
+    """Returns the shared core model bound to structured output for a pydantic schema (rate limited)."""
+    return _shared(("structured", LLM_MODEL, schema), lambda: RateLimitedLLM(_chat_client().with_structured_output(schema)))
 
 
+def get_tool_llm(tools: Sequence):
+    """Returns the shared core model bound to tools (keyed by tool names, rate limited)."""
+    names = tuple(getattr(t, "name", repr(t)) for t in tools)
+    return _shared(("tools", LLM_MODEL, names), lambda: RateLimitedLLM(_chat_client().bind_tools(list(tools))))
@@ -0,0 +1,95 @@
+import hashlib
+import inspect
+import json
+import os
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+from langchain_core.messages import BaseMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from model import LLM_MODEL
+from sqlite_cache import SQLiteCache, CACHE_DIR
+
+# Results of LLM-backed graph nodes, keyed on their exact inputs
+NODE_CACHE_PATH = os.path.join(CACHE_DIR, "node_results.sqlite")
+NODE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+NODE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+# Bump when the cached value format changes (output schemas and tool definitions are part of the key already)
+NODE_CACHE_VERSION = "2"
+
+_node_cache: Optional[SQLiteCache] = None
+
+
+def get_node_cache() -> SQLiteCache:
+    """Returns the process-wide node result cache."""
+    global _node_cache
+    if _node_cache is None:
+        _node_cache = SQLiteCache(
+            NODE_CACHE_PATH, table="node_results", max_bytes=NODE_CACHE_MAX_BYTES, ttl_seconds=NODE_CACHE_TTL_SECONDS
+        )
+    return _node_cache
+
+
+def _canonical(value: Any) -> Any:
+    """
+    JSON-ready form of an LLM input. Messages keep only what the model sees
+    (type, content, tool calls); their ids are random per run and are dropped.
+    """
+    if isinstance(value, BaseMessage):
+        canonical = {"type": value.type, "content": value.content}
+        if getattr(value, "tool_calls", None):
+            canonical["tool_calls"] = [
+                {"name": c["name"], "args": c["args"], "id": c.get("id")} for c in value.tool_calls
+            ]
+        if getattr(value, "tool_call_id", None):
+            canonical["tool_call_id"] = value.tool_call_id
+        return canonical
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    return value
+
+
+@lru_cache(maxsize=64)
+def _schema_definition(output_schema: Optional[type]) -> Any:
+    """JSON schema of a pydantic output model, or 'message' for plain LLM calls."""
+    return output_schema.model_json_schema() if output_schema is not None else "message"
+
+
+def _tool_definition(tool: Any) -> Any:
+    """What the model is told about a bound tool: its schema, or for a plain function its name, signature and docstring."""
+    if isinstance(tool, BaseTool):
+        return convert_to_openai_tool(tool)
+    return {"name": tool.__name__, "signature": str(inspect.signature(tool)), "doc": inspect.getdoc(tool)}
+
+
+@lru_cache(maxsize=64)
+def _tool_definitions(tools: tuple) -> list:
+    """Definitions of the tools an LLM is bound to."""
+    return [_tool_definition(t) for t in tools]
+
+
+def node_cache_key(node: str, llm_input: Any, output_schema: Optional[type] = None, tools: Sequence = ()) -> str:
+    """
+    SHA-256 over the node name, its exact LLM input (the fully formatted prompt or
+    message list, so prompt template edits change the key), the JSON schema of the
+    output model, the definitions of any bound tools and the model version, so a
+    changed schema or tool signature never serves results cached for the old one.
+    """
+    payload = json.dumps(
+        {
+            "version": NODE_CACHE_VERSION,
+            "node": node,
+            "model": LLM_MODEL,
+            "schema": _schema_definition(output_schema),
+            "tools": _tool_definitions(tuple(tools)),
+            "input": _canonical(llm_input),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -1,55 +1,338 @@
 import asyncio
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
 import fitz  # PyMuPDF
 
+# Bump whenever extraction output changes, so cached parses from older versions are ignored
+PARSER_VERSION = "3"
+
+# Paid LlamaParse jobs running at once in this process. When every slot is taken, a report
+# goes without LlamaParse instead of queueing behind jobs that may run to their deadline.
+LLAMAPARSE_MAX_JOBS = int(os.getenv("LLAMAPARSE_MAX_JOBS", "4"))
+_llamaparse_jobs = 0
+_llamaparse_jobs_lock = threading.Lock()
+
+# Section headings of an IXL Diagnostic Action Plan and the score blocks each one must contain.
+# Used to decide whether the PyMuPDF text alone is sufficient for extraction.
+IXL_SCORE_BLOCKS = {
+    "Math strand levels and recommendations": [
+        "Overall math level",
+        "Numbers & Operations",
+        "Algebra & Algebraic Thinking",
+        "Fractions",
+        "Geometry",
+        "Measurement",
+        "Data, Statistics, & Probability",
+    ],
+    "Language arts strand levels and recommendations": [
+        "Overall language arts level",
+        "Overall reading level",
+        "Reading Strategies",
+        "Vocabulary",
+        "Writing Strategies",
+        "Grammar & Mechanics",
+    ],
+}
+
+_SCORE_LINE = re.compile(r"^\d{1,4}$")
+
+# Bounded pool for PyMuPDF work started from async code (text and layout extraction, hashing),
+# so concurrent reports can't pile up an unbounded number of CPU-bound threads
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+PDF_EXECUTOR = ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+
+# Limits for PyMuPDF extraction, so one very large upload (e.g. a multi-student district
+# export) cannot exhaust worker memory. Pages or text beyond the caps are dropped.
+DEFAULT_MAX_PAGES = 1000
+DEFAULT_MAX_CHARS = 5_000_000
+# Documents with at least this many pages are split into page ranges across a process pool
+PARALLEL_PAGE_THRESHOLD = 64
+_PAGE_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+# A PDF given either as a file path or as its content in memory
+PDFSource = Union[str, bytes, bytearray, memoryview]
+
+
+def is_pdf_buffer(source: PDFSource) -> bool:
+    """True if source is in-memory PDF content rather than a file path."""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def open_pdf(source: PDFSource) -> "fitz.Document":
+    """Opens a PDF from a path, or directly from an in-memory buffer without copying it to disk."""
+    if is_pdf_buffer(source):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def describe_pdf_source(source: PDFSource) -> str:
+    """Short label for log messages."""
+    return f"<in-memory PDF, {memoryview(source).nbytes} bytes>" if is_pdf_buffer(source) else source
+
+
+def _claim_llamaparse_slot() -> bool:
+    """Takes one of the LLAMAPARSE_MAX_JOBS slots; False if all are in use."""
+    global _llamaparse_jobs
+    with _llamaparse_jobs_lock:
+        if _llamaparse_jobs >= LLAMAPARSE_MAX_JOBS:
+            return False
+        _llamaparse_jobs += 1
+        return True
+
+
+def _release_llamaparse_slot() -> None:
+    global _llamaparse_jobs
+    with _llamaparse_jobs_lock:
+        _llamaparse_jobs -= 1
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Process pool for page-range extraction, created on first use."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # spawn: workers must not inherit the parent's threads (event loop, PDF executor)
+            _page_pool = ProcessPoolExecutor(
+                max_workers=_PAGE_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _page_pool
+
+
+def iter_page_texts(doc: "fitz.Document", start: int = 0, stop: Optional[int] = None,
+                    max_chars: Optional[int] = None) -> Iterator[str]:
+    """
+    Lazily yields the text of pages [start, stop) of an open document.
+    Stops early once max_chars characters have been yielded; the last page is truncated to fit.
+    """
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    remaining = max_chars
+    for page_number in range(start, stop):
+        text = doc.load_page(page_number).get_text()
+        if remaining is not None:
+            text = text[:remaining]
+            remaining -= len(text)
+        yield text
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def _extract_page_range(file_path: str, start: int, stop: int, max_chars: Optional[int]) -> List[str]:
+    """Process pool worker: opens the file independently and extracts one page range."""
+    with fitz.open(file_path) as doc:
+        return list(iter_page_texts(doc, start, stop, max_chars))
+
+
+def has_all_score_blocks(text: str) -> bool:
+    """
+    Returns True if the text contains every expected score block for each IXL report
+    section it mentions, and enough numeric lines to hold a score for each block.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    line_set = set(lines)
+    expected = [
+        block
+        for section, blocks in IXL_SCORE_BLOCKS.items() if section in line_set
+        for block in blocks
+    ]
+    if not expected or any(block not in line_set for block in expected):
+        return False
+    numeric_lines = sum(1 for line in lines if _SCORE_LINE.match(line))
+    return numeric_lines >= len(expected)
+
+
 class EnhancedPDFParser:
     """Enhanced PDF parser that uses PyMuPDF for fast and reliable text extraction."""
-    
-    def __init__(self):
-        pass
-    
-    def parse_pdf_report(self, file_path: str) -> dict:
+
+    def __init__(self, llamaparse_timeout: float = 60.0, skip_llamaparse_when_sufficient: bool = True,
+                 max_pages: int = DEFAULT_MAX_PAGES, max_chars: int = DEFAULT_MAX_CHARS,
+                 parallel_page_threshold: int = PARALLEL_PAGE_THRESHOLD):
+        """
+        Args:
+            llamaparse_timeout: Hard deadline in seconds for the LlamaParse backend,
+                counted from when its job starts.
+            skip_llamaparse_when_sufficient: Cancel LlamaParse when the PyMuPDF text
+                already contains every expected score block.
+            max_pages: Only the first max_pages pages are extracted with PyMuPDF.
+            max_chars: PyMuPDF text is cut off after max_chars characters.
+            parallel_page_threshold: Documents with at least this many pages are
+                extracted in page ranges on a process pool.
+        """
+        self.llamaparse_timeout = llamaparse_timeout
+        self.skip_llamaparse_when_sufficient = skip_llamaparse_when_sufficient
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.parallel_page_threshold = parallel_page_threshold
+
+    def parse_pdf_report(self, source: PDFSource) -> dict:
         """
         Parse PDF using PyMuPDF and LlamaParse for maximum coverage.
+        Synchronous wrapper around parse_pdf_report_async; must not be called
+        from a thread that is already running an event loop.
+        Args:
+            source: Path to the PDF file, or the PDF content as bytes/memoryview
+        Returns:
+            Dict with keys: 'pymupdf',  'llamaparse', 'backends', 'contributors'
+        """
+        return asyncio.run(self.parse_pdf_report_async(source))
+
+    async def parse_pdf_report_async(self, source: PDFSource) -> dict:
+        """
+        Runs PyMuPDF and LlamaParse concurrently.
+
+        LlamaParse runs on its async API, so it holds no thread: it is given a hard
+        deadline of llamaparse_timeout seconds from when its job starts, and is
+        cancelled as soon as the PyMuPDF text is sufficient on its own. When all
+        LLAMAPARSE_MAX_JOBS slots are busy it is not started at all.
+        In-memory PDFs are read by PyMuPDF straight from the buffer; for those
+        LlamaParse only starts once the PyMuPDF text turns out to be insufficient.
         Args:
-            file_path: Path to the PDF file
+            source: Path to the PDF file, or the PDF content as bytes/memoryview
         Returns:
-            Dict with keys: 'pymupdf',  'llamaparse'
-        """
-        print(f"--- Parsing PDF: {file_path} ---")
-        results = {}
-        
-        # Only use PyMuPDF (fastest)
-        print("🔄 Using PyMuPDF parser only...")
-        pymupdf_text = self._parse_with_pymupdf(file_path)
-        results['pymupdf'] = pymupdf_text
+            Dict with keys:
+            - 'pymupdf', 'llamaparse': extracted text ('' if a backend produced nothing)
+            - 'backends': per-backend {'status', 'seconds', 'chars'} plus 'error' on failure;
+              status is one of 'ok', 'empty', 'error', 'timeout', 'skipped', 'busy'
+            - 'contributors': backends whose text is included
+        """
+        print(f"--- Parsing PDF: {describe_pdf_source(source)} ---")
+        started = time.perf_counter()
+        backends = {}
+
+        def start_llamaparse() -> Optional[asyncio.Task]:
+            if not _claim_llamaparse_slot():
+                return None
+            return asyncio.create_task(self._run_llamaparse(source))
+
+        pymupdf_task = asyncio.get_running_loop().run_in_executor(PDF_EXECUTOR, self._parse_with_pymupdf, source)
+        llamaparse_task = None
+        if is_pdf_buffer(source):
+            print("🔄 Using PyMuPDF on the in-memory PDF, LlamaParse only if needed...")
+        else:
+            print("🔄 Using PyMuPDF and LlamaParse parsers concurrently...")
+            llamaparse_task = start_llamaparse()
+
+        pymupdf_text = await pymupdf_task
+        backends['pymupdf'] = {
+            'status': 'ok' if pymupdf_text else 'empty',
+            'seconds': round(time.perf_counter() - started, 3),
+            'chars': len(pymupdf_text),
+        }
         print(f"✅ PyMuPDF extracted {len(pymupdf_text)} characters")
-        
-        # LlamaParse
+
         llamaparse_text = ''
-        try:
-            from llama_parse import LlamaParse
-            print("🔄 Using LlamaParse parser...")
-            parser = LlamaParse()
-            job = parser.parse(file_path)
-            documents = job.result()
-            llamaparse_text = documents[0].text if documents else ''
-            print(f"✅ LlamaParse extracted {len(llamaparse_text)} characters")
-        except Exception as e:
-            llamaparse_text = ''
-        results['llamaparse'] = llamaparse_text
-        
-        print("--- PDF Parsing Complete ---")
+        if self.skip_llamaparse_when_sufficient and has_all_score_blocks(pymupdf_text):
+            # Cancelling stops the upload / polling and frees the slot right away
+            if llamaparse_task is not None:
+                llamaparse_task.cancel()
+            backends['llamaparse'] = {'status': 'skipped', 'seconds': 0.0, 'chars': 0}
+            print("⏭️ PyMuPDF text has every score block, skipping LlamaParse")
+        else:
+            if is_pdf_buffer(source):
+                llamaparse_task = start_llamaparse()
+            try:
+                if llamaparse_task is None:
+                    backends['llamaparse'] = {'status': 'busy'}
+                    print(f"⚠️ All {LLAMAPARSE_MAX_JOBS} LlamaParse slots are busy, continuing without it")
+                else:
+                    llamaparse_text = await llamaparse_task
+                    backends['llamaparse'] = {'status': 'ok' if llamaparse_text else 'empty'}
+                    print(f"✅ LlamaParse extracted {len(llamaparse_text)} characters")
+            except asyncio.TimeoutError:
+                backends['llamaparse'] = {'status': 'timeout'}
+                print(f"⚠️ LlamaParse did not finish within {self.llamaparse_timeout}s, continuing without it")
+            except Exception as e:
+                backends['llamaparse'] = {'status': 'error', 'error': str(e)}
+                print(f"⚠️ LlamaParse failed: {e}")
+            backends['llamaparse'].update({
+                'seconds': round(time.perf_counter() - started, 3),
+                'chars': len(llamaparse_text),
+            })
+
+        results = {
+            'pymupdf': pymupdf_text,
+            'llamaparse': llamaparse_text,
+            'backends': backends,
+            'contributors': [name for name, info in backends.items() if info['status'] == 'ok'],
+        }
+        print(f"--- PDF Parsing Complete ({', '.join(results['contributors']) or 'no backend'} contributed) ---")
         return results
-    
-    def _parse_with_pymupdf(self, file_path: str) -> str:
-        """Extract text using PyMuPDF."""
+
+    async def _run_llamaparse(self, source: PDFSource) -> str:
+        """Runs one LlamaParse job within llamaparse_timeout and releases its slot however it ends."""
+        try:
+            return await asyncio.wait_for(self._parse_with_llamaparse(source), timeout=self.llamaparse_timeout)
+        finally:
+            _release_llamaparse_slot()
+
+    async def _parse_with_llamaparse(self, source: PDFSource) -> str:
+        """
+        Extract text using LlamaParse's async API. Raises on failure so the caller can record it.
+        In-memory PDFs are uploaded straight from the buffer.
+        """
+        from llama_parse import LlamaParse
+        parser = LlamaParse()
+        if is_pdf_buffer(source):
+            documents = await parser.aload_data(bytes(source), extra_info={"file_name": "report.pdf"})
+        else:
+            documents = await parser.aload_data(source)
+        return documents[0].text if documents else ''
+
+    def _parse_with_pymupdf(self, source: PDFSource) -> str:
+        """
+        Extract text using PyMuPDF, within the max_pages / max_chars caps.
+        Page texts are collected lazily and joined once, separated by form feeds;
+        large documents on disk are split into page ranges extracted in parallel
+        worker processes. In-memory PDFs are always read in this process, since
+        handing the buffer to workers would copy it into each of them.
+        """
         try:
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
+            with open_pdf(source) as doc:
+                page_count = min(doc.page_count, self.max_pages)
+                if doc.page_count > page_count:
+                    print(f"⚠️ PDF has {doc.page_count} pages, extracting only the first {page_count}")
+                if page_count < self.parallel_page_threshold or is_pdf_buffer(source):
+                    pages = list(iter_page_texts(doc, 0, page_count, self.max_chars))
+                else:
+                    pages = None
+            if pages is None:
+                pages = self._parse_pages_in_parallel(source, page_count)
+            # Form feeds keep page boundaries visible to later stages (e.g. prompt compaction)
+            text = "\f".join(pages)
+            if len(text) >= self.max_chars:
+                print(f"⚠️ PyMuPDF text truncated at {self.max_chars} characters")
             return text
         except Exception as e:
             print(f"PyMuPDF error: {e}")
-            return ""
\ No newline at end of file
+            return ""
+
+    def _parse_pages_in_parallel(self, file_path: str, page_count: int) -> List[str]:
+        """Fans page ranges out to the process pool and reassembles them in order, within max_chars."""
+        chunk = -(-page_count // _PAGE_POOL_WORKERS)
+        ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+        print(f"🔄 Extracting {page_count} pages in {len(ranges)} parallel ranges...")
+        pool = _get_page_pool()
+        # Each worker is capped at max_chars on its own; the total is capped again while joining
+        futures = [pool.submit(_extract_page_range, file_path, start, stop, self.max_chars) for start, stop in ranges]
+        pages: List[str] = []
+        remaining = self.max_chars
+        for future in futures:
+            if remaining <= 0:
+                # Enough text already; drop ranges that have not started yet
+                future.cancel()
+                continue
+            for text in future.result():
+                text = text[:remaining]
+                remaining -= len(text)
+                pages.append(text)
+                if remaining <= 0:
+                    break
+        return pages
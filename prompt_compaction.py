@@ -0,0 +1,91 @@
+import re
+from typing import List, Tuple
+
+from pdf_parser import IXL_SCORE_BLOCKS
+
+# Lines that mark a page or block as carrying scores or recommendations
+_RELEVANT_MARKERS = tuple(IXL_SCORE_BLOCKS) + tuple(b for blocks in IXL_SCORE_BLOCKS.values() for b in blocks) + (
+    "recommended skill",
+)
+# Page boundaries: PyMuPDF pages are joined with form feeds, LlamaParse pages with markdown rules
+_PAGE_BREAK = re.compile(r"\f|\n-{3,}\n")
+# Lines that never carry scores or skills: page footers, links and IXL skill codes (e.g. '4T7')
+_BOILERPLATE = re.compile(r"^(Page of - www\.ixl\.com|.*\bixl\.com/\S*\.?|(?=.*[A-Z])[A-Z0-9]{3})$")
+_NUMBER = re.compile(r"^\d{1,4}$")
+# Chart axis ticks run 100, 200, 300, ... up the diagnostic scale
+_AXIS_STEP = 100
+_MIN_AXIS_RUN = 4
+# Rough characters-per-token ratio, used for before/after reporting only
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token)."""
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def _normalize(line: str) -> str:
+    """Comparison key for a line: markdown and table punctuation stripped, whitespace collapsed, lowercased."""
+    return " ".join(re.sub(r"[#*|>_`]+", " ", line).split()).lower()
+
+
+def _relevant_pages(text: str) -> List[str]:
+    """Keeps pages mentioning a score block or recommendations; keeps everything if none do."""
+    pages = [p for p in _PAGE_BREAK.split(text) if p.strip()]
+    relevant = [p for p in pages if any(marker in p for marker in _RELEVANT_MARKERS)]
+    return relevant or pages
+
+
+def _drop_axis_ticks(lines: List[str]) -> List[str]:
+    """Removes chart axis runs (100, 200, 300, ...) and zero ticks, keeping every other number."""
+    kept = []
+    i = 0
+    while i < len(lines):
+        if lines[i] == "0":
+            i += 1
+            continue
+        if lines[i] == str(_AXIS_STEP):
+            j = i + 1
+            while (j < len(lines) and _NUMBER.match(lines[j]) and int(lines[j]) % _AXIS_STEP == 0
+                   and int(lines[j]) > int(lines[j - 1])):
+                j += 1
+            if j - i >= _MIN_AXIS_RUN:
+                i = j
+                continue
+        kept.append(lines[i])
+        i += 1
+    return kept
+
+
+def _compact_lines(text: str, exclude: set = frozenset()) -> List[str]:
+    """Relevant, non-boilerplate lines of text, minus those whose normalized form is in exclude."""
+    lines = []
+    for page in _relevant_pages(text):
+        for line in _drop_axis_ticks([l.strip() for l in page.splitlines()]):
+            if not line or _BOILERPLATE.match(line):
+                continue
+            # Scores repeat legitimately (several strands can share a level), so numbers are always kept
+            if exclude and not _NUMBER.match(line) and _normalize(line) in exclude:
+                continue
+            lines.append(line)
+    return lines
+
+
+def compact_parser_outputs(pymupdf_text: str, llamaparse_text: str) -> Tuple[str, str, dict]:
+    """
+    Shrinks the two parser outputs before they are embedded in the extraction prompt.
+
+    Only pages containing score blocks or recommendations are kept, boilerplate
+    lines (footers, links, skill codes, chart axis ticks) are dropped, and
+    LlamaParse lines already present in the PyMuPDF text are removed.
+    Returns (pymupdf_text, llamaparse_text, stats) where stats has approximate
+    'tokens_before' and 'tokens_after'.
+    """
+    pymupdf_lines = _compact_lines(pymupdf_text or "")
+    compact_pymupdf = "\n".join(pymupdf_lines)
+    compact_llamaparse = "\n".join(_compact_lines(llamaparse_text or "", {_normalize(l) for l in pymupdf_lines}))
+    stats = {
+        "tokens_before": estimate_tokens(pymupdf_text or "") + estimate_tokens(llamaparse_text or ""),
+        "tokens_after": estimate_tokens(compact_pymupdf) + estimate_tokens(compact_llamaparse),
+    }
+    return compact_pymupdf, compact_llamaparse, stats
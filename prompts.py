@@ -3,20 +3,21 @@ You are an expert student assessment analyst. Analyze the student's performance
 
 **CRITICAL: USE TOOLS FOR EVERY CALCULATION**
 
-**Available Tool:**
-`calculate_all_metrics(subject: str, student_score: int, current_grade: str)` - Returns percentile, performing grade, and next grade threshold for a subject in one call.
+**Available Tools:**
+`calculate_metrics_for_subjects(subjects_json: str, current_grade: str)` - Returns percentile, performing grade, and next grade threshold for ALL subjects in one call.
+`calculate_all_metrics(subject: str, student_score: int, current_grade: str)` - Returns the same metrics for a single subject.
 
 **WORKFLOW:**
-1. Call `calculate_all_metrics` for EACH subject in the student data
-2. Call the tool exactly once per subject with the exact subject name, student score, and current grade
-3. After calling the tool for ALL subjects, STOP and proceed to synthesis
+1. Call `calculate_metrics_for_subjects` ONCE, passing the complete Subject Scores JSON below unchanged as `subjects_json` and the student's grade as `current_grade`
+2. Only if that call returns an error, fall back to calling `calculate_all_metrics` once per subject
+3. As soon as you have results for ALL subjects, STOP and proceed to synthesis
 
 **RULES:**
 - ❌ NEVER estimate or guess values
 - ❌ NEVER skip tool calls
-- ✅ ALWAYS call the tool for every subject
+- ❌ NEVER call `calculate_all_metrics` for subjects already covered by `calculate_metrics_for_subjects`
+- ✅ ALWAYS get tool results for every subject
 - ✅ Use exact subject names from the data
-- ✅ Call the tool exactly once per subject
 - ✅ After all subjects are processed, STOP and do not make any more calls
 
 **Student Information:**
@@ -24,86 +25,41 @@ You are an expert student assessment analyst. Analyze the student's performance
 - Student Name: {student_name}
 - Subject Scores: {subjects_json}
 
-**IMPORTANT: After calling the tool for all subjects, you must STOP and not make any additional calls.**
+**IMPORTANT: After you have tool results for all subjects, you must STOP and not make any additional calls.**
 """
 
-SYNTHESIS_PROMPT = """
-You are an expert student assessment analyst. Now that you have all the necessary data from the tool calls, create a structured assessment report with the following sections.
+OVERVIEW_PROMPT = """
+You are an expert student assessment analyst. Write the **overview** section of {student_name}'s assessment report from the calculated results below.
 
-**CRITICAL: ONLY USE ACTUAL VALUES FROM TOOL CALLS**
+Write 2-3 sentences summarizing {student_name}'s overall performance, highlighting key strengths and areas for growth. Mention the student's current grade is {grade}.
+
+**CRITICAL: ONLY USE THE VALUES BELOW**
 - ❌ NEVER make up, estimate, or guess any values
-- ❌ NEVER create data that wasn't provided by the tools
-- ❌ NEVER use placeholder values or approximations
-- ✅ ONLY use the exact values returned by your tool calls
-- ✅ If a tool call failed or returned no data, acknowledge this in the report
-- ✅ If you don't have data for a subject, state "Data not available" rather than guessing
+- ✅ Only reference subjects listed in the results
+- ✅ "grade_level" says whether the student performs above, on or below their grade in each subject
 
-**Formatting Note:** When you list subject names, remove the "End-of-Year " prefix and the " (K-8)" suffix. For example, "End-of-Year Math: Overall (K-8)" should be displayed as "Math: Overall".
+**Calculated Results (one object per subject; percentile and next_grade_threshold are -1 when unavailable):**
+{metrics_json}
 
-**Student Information:**
-- Grade: {grade}
-- Student Name: {student_name}
-- Date: {current_date}
+Return only the overview text, without headings.
+"""
 
-**Instructions for Each Section:**
+SUMMARY_PROMPT = """
+You are an expert student assessment analyst. Write the **summary** section of {student_name}'s assessment report (Grade {grade}) from the calculated results below.
 
-1. **key_findings**: Categorize each subject into one of three groups:
-   - above_grade_level: subjects where performing_grade > student_grade
-   - on_grade_level: subjects where performing_grade = student_grade
-   - below_grade_level: subjects where performing_grade < student_grade
+Create a summary with:
+- Key Strengths (only mention subjects in the results)
+- Areas for Improvement (only mention subjects in the results, drawing on their recommended skills)
+- Overall Readiness Assessment for Next Grade
 
-Return the result as a JSON object with three lists:
-{{
-  "above_grade_level": ["Subject 1", "Subject 2"],
-  "on_grade_level": ["Subject 3"],
-  "below_grade_level": []
-}}
+**CRITICAL: ONLY USE THE VALUES BELOW**
+- ❌ NEVER make up, estimate, or guess any values
+- ✅ "grade_level" says whether the student performs above, on or below their grade in each subject
+
+**Calculated Results (one object per subject; percentile and next_grade_threshold are -1 when unavailable):**
+{metrics_json}
 
-If a group has no subjects, return an empty list for that group.
-If all groups are empty, return an empty object or string.
-Do NOT include any HTML or formatting.
-
-2. **overview**: Write 2-3 sentences summarizing {student_name}'s overall performance, highlighting key strengths and areas for growth. Mention the student's current grade is {grade}. **Only reference subjects with actual tool call data.**
-
-3. **performance_dashboard**: Generate a complete table with all subjects and their data:
-   - **CRITICAL: Follow this EXACT column order for EVERY row:**
-     1. Subject Name
-     2. Score (numeric value only) (only from the tool call data)
-     3. Performance Band (only from the tool call data) - Show the performing grade level (e.g., "3rd grade", "4th grade")
-     4. Percentile (only from the tool call data) (with emoji) 
-     5. Next Grade Threshold (numeric value only) (only from the tool call data)
-     6. Recommended Skills 
-   
-   - **VALIDATION RULES:**
-     - Score column (2nd) must contain ONLY numbers (e.g., 450, 520)
-     - Performance Band column (3rd) must contain the performing grade level (e.g., "3rd grade", "4th grade")
-     - Include percentile emojis (🎉, ⭐, 🏆, etc.)
-     - **ONLY include rows for subjects where you have complete tool call data**
-     - If a subject is missing tool data, either omit it or mark as "Data not available"
-
-4. **summary**: Create a summary section with:
-   - Key Strengths (only mention subjects with actual data)
-   - Areas for Improvement (only mention subjects with actual data)
-   - Overall Readiness Assessment for Next Grade
-   - Format as HTML list
-   - **Only reference subjects that have complete tool call results**
-
-5. **methodology**: Use the following exact text and link, formatted as HTML, for the methodology section:
-Performance bands and percentiles are based on end-of-year benchmarks and national grade-level data from IXL's National Norms. Advanced scores use the next grade's data for percentile calculation.<br><br><strong>Data Source:</strong> IXL's ELO score rating system <a href=\"https://www.ixl.com/materials/us/research/National_Norms_for_IXL_s_Diagnostic_in_Grades_K-12.pdf\" target=\"_blank\" rel=\"noopener noreferrer\">National Norms for IXL's Diagnostic in Grades K-12</a>.
-
-**Percentile Rankings Reference:**
-- 🎉 90-100th: Outstanding!
-- ⭐ 80-89th: Excellent!
-- 🏆 70-79th: Great job!
-- 👍 60-69th: Good work!
-- 📈 50-59th: On track!
-- 💪 40-49th: Keep going!
-- 📚 30-39th: More practice needed
-- 🔧 20-29th: Needs support
-- 💡 10-19th: Let's work on this
-- 🌱 1-9th: Starting fresh
-
-**IMPORTANT: Double-check your table structure before finalizing. Each row must follow the exact column order specified above. ONLY include subjects with complete tool call data.**
+Format the summary as an HTML list. Do NOT include the score table; it is rendered separately.
 """
 
 SUBJECT_MAPPING_PROMPT = """
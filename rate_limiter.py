@@ -0,0 +1,371 @@
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from langchain_core.runnables import Runnable
+
+# Gemini quota of the API key, shared by every model call in the process
+LLM_RPM = float(os.getenv("LLM_RPM", "1000"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+# Calls in flight at once: the AIMD window starts at LLM_INITIAL_CONCURRENCY and moves between 1 and LLM_MAX_CONCURRENCY
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+# Attempts per call when the API throttles (429 / RESOURCE_EXHAUSTED), with exponential backoff and full jitter
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+# The window is halved on a throttle, at most once per cooldown (one burst of 429s is one congestion signal)
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_DECREASE_COOLDOWN_SECONDS = 2.0
+
+# Token estimate for the TPM bucket: prompt characters per token, plus a fixed allowance for the response
+CHARS_PER_TOKEN = 4
+RESPONSE_TOKENS_ESTIMATE = 1024
+
+_THROTTLE_MARKERS = ("429", "resource_exhausted", "resource exhausted", "rate limit", "quota")
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """True for rate limit / quota errors from the Gemini SDK or LangChain, which are worth retrying."""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    if type(error).__name__ in ("GoogleRateLimitError", "RateLimitError", "ResourceExhausted"):
+        return True
+    text = str(error).lower()
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+def estimate_tokens(llm_input: Any) -> int:
+    """Rough token count of a prompt (string, PromptValue or message list) plus the response allowance."""
+    if hasattr(llm_input, "to_messages"):
+        llm_input = llm_input.to_messages()
+    if isinstance(llm_input, (list, tuple)):
+        text = "".join(str(getattr(m, "content", m)) for m in llm_input)
+    else:
+        text = str(llm_input)
+    return len(text) // CHARS_PER_TOKEN + RESPONSE_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate per second up to capacity. Reservations take their
+    tokens immediately and may overdraw the bucket; the caller waits out the debt,
+    so callers are served in reservation order.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Takes amount (at most one full bucket) and returns the seconds until it is covered."""
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        """Returns tokens (negative amounts take more, e.g. when a call used more than estimated)."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide limiter for LLM calls: requests-per-minute and tokens-per-minute token
+    buckets, an AIMD concurrency window (grows by one slot per window of successful
+    calls, halves on a throttle) and retries with exponential backoff and jitter on
+    throttling errors. State is guarded by a thread lock and async waiters are woken on
+    their own event loop, so runs on different loops or threads (and blocking run_sync
+    calls) share one quota.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 initial_concurrency: int = LLM_INITIAL_CONCURRENCY, max_attempts: int = LLM_MAX_ATTEMPTS):
+        self.requests = TokenBucket(rpm, rpm / 60)
+        self.tokens = TokenBucket(tpm, tpm / 60)
+        self.max_concurrency = max(1, max_concurrency)
+        self.window = float(min(max(1, initial_concurrency), self.max_concurrency))
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[Any] = deque()  # asyncio.Futures of async calls, threading.Events of sync ones
+        self._pacing = 0  # calls sleeping until the buckets cover them
+        self._last_decrease = 0.0
+        self._counters = {"calls": 0, "throttled": 0, "retries": 0, "failed": 0, "tokens_estimated": 0}
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.window))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth (calls waiting for quota or a slot), calls in flight, window and counters."""
+        with self._lock:
+            return {
+                "queued": len(self._waiters) + self._pacing,
+                "in_flight": self._in_flight,
+                "window": round(self.window, 2),
+                **self._counters,
+            }
+
+    def _reserve_quota(self, tokens: int) -> float:
+        """Reserves one request and the tokens; returns the seconds to wait until the buckets cover them."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            self._pacing += delay > 0
+        return delay
+
+    def _refund_quota(self, tokens: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refund(1, now)
+            self.tokens.refund(tokens, now)
+
+    def _done_pacing(self) -> None:
+        with self._lock:
+            self._pacing -= 1
+
+    async def _wait_for_quota(self, tokens: int) -> None:
+        delay = self._reserve_quota(tokens)
+        if delay <= 0:
+            return
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self._refund_quota(tokens)
+            raise
+        finally:
+            self._done_pacing()
+
+    def _wait_for_quota_sync(self, tokens: int) -> None:
+        delay = self._reserve_quota(tokens)
+        if delay <= 0:
+            return
+        try:
+            time.sleep(delay)
+        except BaseException:
+            self._refund_quota(tokens)
+            raise
+        finally:
+            self._done_pacing()
+
+    def _try_acquire(self, new_waiter: Callable[[], Any]) -> Optional[Any]:
+        """Takes a free slot and returns None, or queues and returns a new_waiter() to wait on."""
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return None
+            waiter = new_waiter()
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter: Any) -> None:
+        """Withdraws a waiter that stopped waiting (cancelled or interrupted)."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            else:
+                # The slot was handed over just as this call stopped waiting; pass it on
+                self._in_flight -= 1
+                self._wake()
+
+    async def _acquire_slot(self) -> None:
+        waiter = self._try_acquire(lambda: asyncio.get_running_loop().create_future())
+        if waiter is None:
+            return
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _acquire_slot_sync(self) -> None:
+        waiter = self._try_acquire(threading.Event)
+        if waiter is None:
+            return
+        try:
+            waiter.wait()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _wake(self) -> None:
+        """Hands free slots to the oldest waiters (the caller holds the lock)."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            self._in_flight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                waiter.get_loop().call_soon_threadsafe(_resolve, waiter)
+
+    def _release(self, outcome: str) -> None:
+        """Frees a slot and adjusts the window: additive increase on 'ok', multiplicative decrease on 'throttled'."""
+        with self._lock:
+            self._in_flight -= 1
+            if outcome == "ok":
+                self.window = min(self.max_concurrency, self.window + 1 / self.window)
+            elif outcome == "throttled":
+                now = time.monotonic()
+                if now - self._last_decrease >= AIMD_DECREASE_COOLDOWN_SECONDS:
+                    self.window = max(1.0, self.window * AIMD_DECREASE_FACTOR)
+                    self._last_decrease = now
+            self._wake()
+
+    def _reconcile(self, estimated: int, result: Any) -> None:
+        """Corrects the TPM bucket with the reported usage, when the result is a message that carries it."""
+        usage = getattr(result, "usage_metadata", None) or {}
+        actual = usage.get("total_tokens") if isinstance(usage, dict) else None
+        if actual:
+            with self._lock:
+                self.tokens.refund(estimated - actual, time.monotonic())
+
+    def _start_call(self, llm_input: Any) -> int:
+        """Counts a new call; returns its token estimate."""
+        tokens = estimate_tokens(llm_input)
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["tokens_estimated"] += tokens
+        return tokens
+
+    def _throttled(self, error: Exception, attempt: int) -> bool:
+        """Counts a throttled attempt; returns True if it was the last one."""
+        last = attempt == self.max_attempts
+        with self._lock:
+            self._counters["throttled"] += 1
+            self._counters["failed" if last else "retries"] += 1
+        if last:
+            print(f"--- LLM call still throttled after {attempt} attempts, giving up: {error} ---")
+        return last
+
+    def _backoff(self, attempt: int) -> float:
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)))
+        print(f"⏳ LLM throttled (attempt {attempt}/{self.max_attempts}), retrying in {delay:.1f}s {self.stats()}")
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[Any]], llm_input: Any) -> Any:
+        """Awaits call() within the quota and the concurrency window, retrying it while the API throttles."""
+        tokens = self._start_call(llm_input)
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_quota(tokens)
+            await self._acquire_slot()
+            outcome = "error"
+            try:
+                result = await call()
+                outcome = "ok"
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                outcome = "throttled"
+                if self._throttled(e, attempt):
+                    raise
+            finally:
+                self._release(outcome)
+            if outcome == "ok":
+                self._reconcile(tokens, result)
+                return result
+            await asyncio.sleep(self._backoff(attempt))
+
+    def run_sync(self, call: Callable[[], Any], llm_input: Any) -> Any:
+        """
+        Blocking run: calls call() within the same quota and window, sleeping the calling
+        thread while it waits, so it is safe from any thread (including one running an event loop).
+        """
+        tokens = self._start_call(llm_input)
+        for attempt in range(1, self.max_attempts + 1):
+            self._wait_for_quota_sync(tokens)
+            self._acquire_slot_sync()
+            outcome = "error"
+            try:
+                result = call()
+                outcome = "ok"
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                outcome = "throttled"
+                if self._throttled(e, attempt):
+                    raise
+            finally:
+                self._release(outcome)
+            if outcome == "ok":
+                self._reconcile(tokens, result)
+                return result
+            time.sleep(self._backoff(attempt))
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimitedLLM(Runnable):
+    """
+    Wraps a chat model or bound runnable so every invoke/ainvoke goes through the
+    limiter. Being a Runnable itself, chains built on it (with_config, bind, pipes,
+    batch) call back into the limited ainvoke, and model methods that derive a new
+    runnable (with_structured_output, bind_tools) return it wrapped with the same
+    limiter. Other attributes are those of the wrapped runnable.
+    """
+
+    def __init__(self, runnable: Any, limiter: Optional[LLMRateLimiter] = None):
+        self.runnable = runnable
+        self.limiter = limiter
+
+    async def ainvoke(self, llm_input: Any, config: Any = None, **kwargs) -> Any:
+        limiter = self.limiter or get_rate_limiter()
+        return await limiter.run(lambda: self.runnable.ainvoke(llm_input, config, **kwargs), llm_input)
+
+    def invoke(self, llm_input: Any, config: Any = None, **kwargs) -> Any:
+        limiter = self.limiter or get_rate_limiter()
+        return limiter.run_sync(lambda: self.runnable.invoke(llm_input, config, **kwargs), llm_input)
+
+    def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+        return self.runnable.get_name(suffix, name=name)
+
+    @property
+    def InputType(self) -> Any:
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.runnable.OutputType
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "runnable" or name.startswith("__"):
+            # Not set yet (e.g. while copying); never forward these
+            raise AttributeError(name)
+        attr = getattr(self.runnable, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+
+        @functools.wraps(attr)
+        def limited(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return RateLimitedLLM(result, self.limiter) if isinstance(result, Runnable) else result
+
+        return limited
+
+
+_rate_limiter: Optional[LLMRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> LLMRateLimiter:
+    """Returns the process-wide LLM rate limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = LLMRateLimiter()
+    return _rate_limiter
@@ -1,4 +1,30 @@
-def format_sections_to_report(report, student_name: str, grade: str, date: str) -> str:
+# Methodology section; the citation is always included, whatever methodology text a report carries
+IXL_NORMS_LINK = '<a href="https://www.ixl.com/materials/us/research/National_Norms_for_IXL_s_Diagnostic_in_Grades_K-12.pdf" target="_blank" rel="noopener noreferrer">National Norms for IXL\'s Diagnostic in Grades K-12</a>'
+METHODOLOGY_HTML = (
+    "Performance bands and percentiles are based on end-of-year benchmarks and national grade-level data from IXL's National Norms. "
+    "Advanced scores use the next grade's data for percentile calculation.<br><br>"
+    "<strong>Data Source:</strong> IXL's ELO score rating system "
+    f"{IXL_NORMS_LINK}."
+)
+
+# Performing grade cell colors by grade level band (see cohort.ABOVE_GRADE_LEVEL etc.)
+GRADE_LEVEL_COLORS = {
+    'Above Grade Level': '#C8E6C9',  # Green
+    'On Grade Level': '#FFF9C4',  # Yellow
+    'Below Grade Level': '#FFCDD2',  # Red
+    'No Data': '#f8f9fa',
+}
+
+# Placeholder for prose sections of a partial report that are still being written
+PENDING_SECTION_HTML = "<em>⏳ Writing this section...</em>"
+
+
+def display_subject_name(subject: str) -> str:
+    """Official subject name without the 'End-of-Year ' prefix and ' (K-8)' suffix."""
+    return str(subject).replace("End-of-Year ", "").replace(" (K-8)", "")
+
+
+def format_sections_to_report(report, student_name: str, grade: str, date: str, norms_version: str = "") -> str:
     """Combines the structured sections into a complete formatted report."""
     
     # Generate dashboard HTML directly from structured data
@@ -18,31 +44,9 @@ def format_sections_to_report(report, student_name: str, grade: str, date: str)
     """
     
     for row in report.performance_dashboard.table_rows:
-        # Calculate color based on performing_grade vs student grade
-        try:
-            # Convert student grade to number (handle K as 0)
-            student_grade_num = 0 if grade.upper() == 'K' else int(grade)
-            # Extract performing grade number from the performing_grade text
-            import re
-            pg_text = str(row.performing_grade).lower().strip()
-            match = re.search(r'(\d+)(?:st|nd|rd|th)?\s*grade', pg_text)
-            if match:
-                performing_grade_num = int(match.group(1))
-            elif pg_text.isdigit():
-                performing_grade_num = int(pg_text)
-            elif 'k' in pg_text:
-                performing_grade_num = 0
-            else:
-                performing_grade_num = student_grade_num  # fallback
-            # Determine color
-            if performing_grade_num > student_grade_num:
-                band_color = "#C8E6C9"  # Green
-            elif performing_grade_num == student_grade_num:
-                band_color = "#FFF9C4"  # Yellow
-            else:
-                band_color = "#FFCDD2"  # Red
-        except Exception:
-            band_color = "#C8E6C9"  # fallback
+        # Color the performing grade by the computed grade level band
+        band_color = GRADE_LEVEL_COLORS.get(row.performance_band, "#f8f9fa")
+        next_grade_threshold = row.next_grade_threshold if row.next_grade_threshold >= 0 else "N/A"
         # Format recommended skills
         skills_html = ""
         if row.recommended_skills:
@@ -58,7 +62,7 @@ def format_sections_to_report(report, student_name: str, grade: str, date: str)
                 <td style="padding: 10px; border: 1px solid #ddd; text-align: center; font-weight: bold;">{row.score}</td>
                 <td style="padding: 10px; border: 1px solid #ddd; text-align: center; background-color: {band_color};">{row.performing_grade}</td>
                 <td style="padding: 10px; border: 1px solid #ddd; text-align: center;">{row.percentile}</td>
-                <td style="padding: 10px; border: 1px solid #ddd; text-align: center;">{row.next_grade_threshold}</td>
+                <td style="padding: 10px; border: 1px solid #ddd; text-align: center;">{next_grade_threshold}</td>
                 <td style="padding: 10px; border: 1px solid #ddd;">{skills_html}</td>
             </tr>
         """
@@ -70,45 +74,33 @@ def format_sections_to_report(report, student_name: str, grade: str, date: str)
 
     # Fallbacks for empty sections
     summary_html = report.summary.strip() if getattr(report, 'summary', '').strip() else '<em>No summary provided.</em>'
-    methodology_html = report.methodology.strip() if getattr(report, 'methodology', '').strip() else ''
+    methodology_html = report.methodology.strip() if getattr(report, 'methodology', '').strip() else METHODOLOGY_HTML
     
     # Ensure your exact citation and PDF link is present in methodology
-    ixl_pdf_link = '<a href="https://www.ixl.com/materials/us/research/National_Norms_for_IXL_s_Diagnostic_in_Grades_K-12.pdf" target="_blank" rel="noopener noreferrer">National Norms for IXL\'s Diagnostic in Grades K-12</a>'
-    required_citation = (
-        "Performance bands and percentiles are based on end-of-year benchmarks and national grade-level data from IXL's National Norms. "
-        "Advanced scores use the next grade's data for percentile calculation.<br><br>"
-        "<strong>Data Source:</strong> IXL's ELO score rating system "
-        f"{ixl_pdf_link}."
-    )
     if 'ixl.com/materials/us/research/national_norms_for_ixl_s_diagnostic_in_grades_k-12.pdf' not in methodology_html.lower():
-        methodology_html += f"<br><br>{required_citation}"
+        methodology_html += f"<br><br>{METHODOLOGY_HTML}"
+    # Record which benchmark norms the numbers were calculated against
+    if norms_version:
+        methodology_html += f"<br><br><strong>Benchmark Norms Version:</strong> {norms_version}"
     
-    # Render Key Findings as colored cards with bulleted lists from JSON structure
-    import json
+    # Render Key Findings as colored cards with bulleted lists
     key_findings_html = ''
-    try:
-        key_findings_data = report.key_findings
-        if isinstance(key_findings_data, str):
-            key_findings_data = json.loads(key_findings_data) if key_findings_data.strip() else {}
-        if key_findings_data:
-            group_styles = {
-                'above_grade_level': ('Above Grade Level', '#d4edda'),
-                'on_grade_level': ('On Grade Level', '#fff3cd'),
-                'below_grade_level': ('Below Grade Level', '#f8d7da'),
-            }
-            for group, (label, color) in group_styles.items():
-                subjects = key_findings_data.get(group, [])
-                if subjects:
-                    key_findings_html += f"""
-                    <div style='background: {color}; border-radius: 8px; padding: 16px; margin-bottom: 12px;'>
-                        <strong>{label}:</strong>
-                        <ul style='margin: 8px 0 0 18px;'>
-                            {''.join(f'<li>{s}</li>' for s in subjects)}
-                        </ul>
-                    </div>
-                    """
-    except Exception:
-        key_findings_html = ''
+    group_styles = {
+        'above_grade_level': ('Above Grade Level', '#d4edda'),
+        'on_grade_level': ('On Grade Level', '#fff3cd'),
+        'below_grade_level': ('Below Grade Level', '#f8d7da'),
+    }
+    for group, (label, color) in group_styles.items():
+        subjects = getattr(report.key_findings, group, [])
+        if subjects:
+            key_findings_html += f"""
+            <div style='background: {color}; border-radius: 8px; padding: 16px; margin-bottom: 12px;'>
+                <strong>{label}:</strong>
+                <ul style='margin: 8px 0 0 18px;'>
+                    {''.join(f'<li>{s}</li>' for s in subjects)}
+                </ul>
+            </div>
+            """
 
     # Only render the section if there is content
     key_findings_section = ''
@@ -156,4 +148,71 @@ def format_sections_to_report(report, student_name: str, grade: str, date: str)
         </div>
       </div>
     </div>
-    """ 
\ No newline at end of file
+    """ 
+
+def format_cohort_report(summary: dict, title: str, date: str) -> str:
+    """Formats a cohort summary (see cohort.cohort_summary) as an HTML report."""
+    header_style = "padding: 12px; text-align: center; border: 1px solid #ddd;"
+    cell_style = "padding: 10px; border: 1px solid #ddd; text-align: center;"
+
+    def table(frame, first_header: str, color_columns: bool = False) -> str:
+        html = """
+    <table style="width: 100%; border-collapse: collapse; margin: 20px 0; font-family: Arial, sans-serif;">
+        <thead>
+            <tr style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white;">
+        """
+        html += f'<th style="padding: 12px; text-align: left; border: 1px solid #ddd;">{first_header}</th>'
+        for column in frame.columns:
+            html += f'<th style="{header_style}">{column}</th>'
+        html += "</tr></thead><tbody>"
+        for subject, row in frame.iterrows():
+            html += '<tr style="border-bottom: 1px solid #ddd;">'
+            html += f'<td style="padding: 10px; border: 1px solid #ddd; font-weight: bold;">{display_subject_name(subject)}</td>'
+            for column, value in row.items():
+                background = f" background-color: {GRADE_LEVEL_COLORS[column]};" if color_columns and column in GRADE_LEVEL_COLORS else ""
+                html += f'<td style="{cell_style}{background}">{value}</td>'
+            html += "</tr>"
+        html += "</tbody></table>"
+        return html
+
+    subjects = summary["subjects"].rename(columns={
+        'students': 'Students', 'mean_score': 'Mean Score', 'median_score': 'Median Score',
+        'min_score': 'Min', 'max_score': 'Max', 'mean_percentile': 'Mean Percentile',
+        'median_percentile': 'Median Percentile',
+    })
+    section_style = "background: #fff; padding: 28px; border-radius: 12px; box-shadow: 0 2px 8px 0 rgba(80, 80, 120, 0.04); margin-bottom: 28px;"
+    heading_style = "color: #2c3e50; border-bottom: 2px solid #7ed957; padding-bottom: 10px; font-size: 1.4em; font-weight: 700; margin: 0 0 18px 0;"
+    norms_note = f"<br><br><strong>Benchmark Norms Version:</strong> {summary['norms_version']}" if summary.get("norms_version") else ""
+
+    return f"""
+    <div style="background: linear-gradient(135deg, #f8fafc 0%, #e3e9f3 100%); min-height: 100vh; padding: 40px 0;">
+      <div style="max-width: 1200px; margin: 0 auto;">
+        <div style="background: #fff; border-radius: 18px; box-shadow: 0 4px 24px 0 rgba(80, 80, 120, 0.08); padding: 32px 32px 24px 32px; margin-bottom: 32px;">
+          <div style="background: linear-gradient(135deg, #667eea 0%, #7ed957 100%); color: white; padding: 24px; border-radius: 12px; margin-bottom: 28px; box-shadow: 0 2px 8px 0 rgba(80, 80, 120, 0.08);">
+            <h1 style="margin: 0; text-align: center; font-size: 2.2em; font-weight: 800; letter-spacing: 0.01em;">🏫 {title}</h1>
+          </div>
+          <div style="background: #f8f9fa; padding: 18px; border-radius: 10px; margin-bottom: 28px; display: flex; justify-content: space-between; align-items: center;">
+            <span style="font-weight: 600; font-size: 1.15em;"><strong>Students:</strong> {summary['students']}</span>
+            <span style="font-weight: 600; font-size: 1.15em;"><strong>Subject Results:</strong> {summary['rows']}</span>
+            <span style="font-weight: 600; font-size: 1.15em;"><strong>Date:</strong> {date}</span>
+          </div>
+          <div style="{section_style}">
+            <h2 style="{heading_style}">1. Grade Level Overview</h2>
+            {table(summary['grade_level_counts'], 'Subject', color_columns=True)}
+          </div>
+          <div style="{section_style}">
+            <h2 style="{heading_style}">2. Score Distribution</h2>
+            {table(subjects, 'Subject')}
+          </div>
+          <div style="{section_style}">
+            <h2 style="{heading_style}">3. Percentile Distribution</h2>
+            {table(summary['percentile_distribution'], 'Subject')}
+          </div>
+          <div style="background: #f8f9fa; padding: 22px; border-radius: 12px; border-left: 5px solid #7ed957; margin-bottom: 0;">
+            <h2 style="color: #2c3e50; border-bottom: 2px solid #6c757d; padding-bottom: 10px; font-size: 1.2em; font-weight: 700; margin: 0 0 18px 0;">4. Methodology</h2>
+            <div style="color: #444; line-height: 1.7; font-size: 1.05em;">Performance bands compare each student's performing grade (the highest grade whose 70th percentile benchmark the score meets) with their current grade. Percentiles are based on end-of-year national grade-level data from IXL's National Norms.<br><br><strong>Data Source:</strong> IXL's ELO score rating system {IXL_NORMS_LINK}.{norms_note}</div>
+          </div>
+        </div>
+      </div>
+    </div>
+    """
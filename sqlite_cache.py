@@ -0,0 +1,107 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+CACHE_DIR = ".cache"
+
+
+class SQLiteCache:
+    """
+    Small key/value cache persisted in a local SQLite file.
+
+    Values are stored as JSON. The total stored size is capped at max_bytes;
+    when a write pushes it over the cap, the least recently used entries are
+    evicted first. With ttl_seconds set, entries older than that are treated
+    as misses and purged. Hit, miss and eviction counts are kept per process.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_bytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_lru ON {self.table} (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation (keeps the cache safe to share across threads)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for key (and marks it recently used), or None."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        """Stores value under key, then evicts expired entries and least recently used ones above max_bytes."""
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.ttl_seconds is not None:
+            expired = conn.execute(
+                f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self.evictions += expired
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Per-process hit/miss/eviction counters plus the current entry count and size."""
+        with self._connect() as conn:
+            entries, total = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
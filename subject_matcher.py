@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from grade_reader import grade_sort_key
+from sqlite_cache import CACHE_DIR
+
+# Raw subject -> official subject mappings the LLM gave in earlier runs (see confirmed_by_ranker)
+SUBJECT_ALIASES_PATH = os.path.join(CACHE_DIR, "subject_aliases.json")
+
+# A fuzzy match is accepted without the LLM when it scores at least MATCH_THRESHOLD
+# and beats the best match for any other subject by at least MIN_MARGIN
+MATCH_THRESHOLD = 0.85
+MIN_MARGIN = 0.1
+# An LLM mapping is only learned (and a learned alias only used) when the fuzzy ranker also
+# puts that subject first, ties included, with at least this similarity
+LEARN_FLOOR = 0.6
+
+_SYNONYMS = [
+    (r"\benglish language arts\b|\blanguage arts\b|\benglish\b", "ela"),
+    (r"\bmathematics\b", "math"),
+    (r"&", " and "),
+]
+# Words that don't distinguish subjects: official title qualifiers (End-of-Year, K-8, High School) and filler
+_IGNORED_TOKENS = {"end", "of", "year", "eoy", "k", "8", "high", "school", "and", "the", "level", "levels"}
+# Subject areas; a raw name without one (e.g. 'Fractions') is compared against official titles without theirs
+_AREA_TOKENS = {"math", "ela"}
+_HIGH_SCHOOL_PREFIX = "High School"
+_FIRST_HIGH_SCHOOL_GRADE = 9
+
+
+class SubjectMatch(BaseModel):
+    """Result of matching one raw subject against the official subject list."""
+    raw_subject: str
+    official_subject: Optional[str] = Field(default=None, description="Best official subject, or None if no candidate was close.")
+    confidence: float = 0.0
+    source: str = Field(default="fuzzy", description="'alias' (learned table) or 'fuzzy' (similarity match)")
+    confident: bool = False
+
+
+def subject_tokens(name: str) -> Tuple[str, ...]:
+    """Normalized, sorted tokens of a subject name; official titles lose their End-of-Year/K-8/High School qualifiers."""
+    text = name.lower()
+    for pattern, replacement in _SYNONYMS:
+        text = re.sub(pattern, replacement, text)
+    tokens = {t for t in re.findall(r"[a-z0-9]+", text) if t not in _IGNORED_TOKENS}
+    # 'High School Reading Level' carries no area, unlike 'ELA: Reading Level'
+    if "reading" in tokens:
+        tokens.add("ela")
+    return tuple(sorted(tokens))
+
+
+def _levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _edit_similarity(a: str, b: str) -> float:
+    if not a and not b:
+        return 1.0
+    return 1.0 - _levenshtein(a, b) / max(len(a), len(b))
+
+
+def _token_similarity(raw: Tuple[str, ...], official: Tuple[str, ...]) -> float:
+    """Token-set similarity, counting near-identical tokens (e.g. 'statistic'/'statistics') as shared."""
+    if not raw or not official:
+        return 0.0
+    shared = sum(1 for t in raw if any(_edit_similarity(t, o) >= 0.8 for o in official))
+    containment = shared / len(raw)
+    dice = 2 * shared / (len(raw) + len(official))
+    return (containment + dice) / 2
+
+
+def subject_similarity(raw: Tuple[str, ...], official: Tuple[str, ...]) -> float:
+    """Blend of token-set similarity and edit distance over the sorted tokens, in [0, 1]."""
+    return 0.6 * _token_similarity(raw, official) + 0.4 * _edit_similarity(" ".join(raw), " ".join(official))
+
+
+class AliasTable:
+    """Persistent raw subject -> official subject table, shared by all runs in the process."""
+
+    def __init__(self, path: str = SUBJECT_ALIASES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._aliases: Dict[str, str] = json.load(f)
+        except (OSError, ValueError):
+            self._aliases = {}
+
+    @staticmethod
+    def _key(raw_subject: str) -> str:
+        return " ".join(subject_tokens(raw_subject))
+
+    def get(self, raw_subject: str) -> Optional[str]:
+        return self._aliases.get(self._key(raw_subject))
+
+    def learn(self, mappings: Dict[str, str]) -> None:
+        """Records confirmed mappings and writes the table if anything changed."""
+        with self._lock:
+            updates = {self._key(raw): official for raw, official in mappings.items() if official}
+            if all(self._aliases.get(k) == v for k, v in updates.items()):
+                return
+            self._aliases.update(updates)
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._aliases, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+_alias_table: Optional[AliasTable] = None
+
+
+def get_alias_table() -> AliasTable:
+    """Returns the process-wide alias table."""
+    global _alias_table
+    if _alias_table is None:
+        _alias_table = AliasTable()
+    return _alias_table
+
+
+@lru_cache(maxsize=64)
+def _official_groups(official_subjects: Tuple[str, ...]) -> Dict[Tuple[str, ...], List[str]]:
+    """Official titles grouped by their tokens, so K-8 and High School variants form one candidate."""
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for official in official_subjects:
+        groups.setdefault(subject_tokens(official), []).append(official)
+    return groups
+
+
+@lru_cache(maxsize=4096)
+def _scores(raw: Tuple[str, ...], official_subjects: Tuple[str, ...]) -> Dict[Tuple[str, ...], float]:
+    """Similarity of a raw subject to each official candidate, keyed by the candidate's tokens."""
+    compare_areas = bool(_AREA_TOKENS.intersection(raw))
+    scores = {}
+    for tokens in _official_groups(official_subjects):
+        candidate = tokens if compare_areas else tuple(t for t in tokens if t not in _AREA_TOKENS)
+        scores[tokens] = subject_similarity(raw, candidate)
+    return scores
+
+
+@lru_cache(maxsize=4096)
+def _rank(raw: Tuple[str, ...], official_subjects: Tuple[str, ...]) -> Tuple[float, float, Tuple[str, ...]]:
+    """(best similarity, runner-up similarity, best candidate's tokens) for a raw subject."""
+    scored = sorted(((score, tokens) for tokens, score in _scores(raw, official_subjects).items()), reverse=True)
+    runner_up = scored[1][0] if len(scored) > 1 else 0.0
+    return scored[0][0], runner_up, scored[0][1]
+
+
+def confirmed_by_ranker(raw_subject: str, official_subject: str, official_subjects: Iterable[str]) -> bool:
+    """
+    True if the fuzzy ranker also ranks official_subject first for raw_subject (ties
+    included) with at least LEARN_FLOOR similarity. Guards the alias table, so a wrong
+    LLM answer is never remembered as a mapping.
+    """
+    official_subjects = tuple(official_subjects)
+    if official_subject not in official_subjects:
+        return False
+    raw = subject_tokens(raw_subject)
+    best, _, _ = _rank(raw, official_subjects)
+    score = _scores(raw, official_subjects)[subject_tokens(official_subject)]
+    return score >= LEARN_FLOOR and score >= best
+
+
+def _for_grade(candidates: List[str], grade: Optional[str]) -> str:
+    """Picks the K-8 or High School variant of an official subject for the student's grade."""
+    if len(candidates) == 1 or grade is None:
+        return candidates[0]
+    number = grade_sort_key(grade)
+    high_school = _FIRST_HIGH_SCHOOL_GRADE <= number < 99
+    preferred = [c for c in candidates if c.startswith(_HIGH_SCHOOL_PREFIX) == high_school]
+    return (preferred or candidates)[0]
+
+
+def match_subject(raw_subject: str, official_subjects: Iterable[str], grade: Optional[str] = None,
+                  aliases: Optional[AliasTable] = None) -> SubjectMatch:
+    """
+    Matches one raw subject name to the official list: first through the alias table
+    (when the ranker still confirms the alias), then by similarity. Official titles that differ only in their K-8 / High School
+    qualifier are treated as one candidate and resolved by grade.
+    """
+    official_subjects = tuple(official_subjects)
+    if not official_subjects:
+        return SubjectMatch(raw_subject=raw_subject)
+    groups = _official_groups(official_subjects)
+
+    alias = aliases.get(raw_subject) if aliases is not None else None
+    if alias is not None and confirmed_by_ranker(raw_subject, alias, official_subjects):
+        return SubjectMatch(raw_subject=raw_subject, official_subject=_for_grade(groups[subject_tokens(alias)], grade),
+                            confidence=1.0, source="alias", confident=True)
+
+    best, runner_up, tokens = _rank(subject_tokens(raw_subject), official_subjects)
+    return SubjectMatch(
+        raw_subject=raw_subject,
+        official_subject=_for_grade(groups[tokens], grade),
+        confidence=round(best, 3),
+        confident=best >= MATCH_THRESHOLD and best - runner_up >= MIN_MARGIN,
+    )
+
+
+def match_subjects(raw_subjects: Iterable[str], official_subjects: Iterable[str], grade: Optional[str] = None,
+                   aliases: Optional[AliasTable] = None) -> Tuple[Dict[str, str], List[SubjectMatch]]:
+    """
+    Matches every raw subject. Returns (confident mappings raw -> official,
+    low-confidence matches that still need the LLM).
+    """
+    official_subjects = tuple(official_subjects)
+    mapped: Dict[str, str] = {}
+    unresolved: List[SubjectMatch] = []
+    for raw_subject in dict.fromkeys(raw_subjects):
+        match = match_subject(raw_subject, official_subjects, grade, aliases)
+        if match.confident:
+            mapped[raw_subject] = match.official_subject
+        else:
+            unresolved.append(match)
+    return mapped, unresolved
@@ -0,0 +1,123 @@
+import asyncio
+import os
+import re
+import sys
+
+import pytest
+
+# The modules live at the repository root and read assets/ relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PDF_PATHS = [
+    os.path.join("assets", "IXL-Diagnostic-Report_2025-06-20_Daniel.pdf"),
+    os.path.join("assets", "IXL-Diagnostic-Report_2025-06-20_Timothy.pdf"),
+    os.path.join("assets", "IXL-Diagnostic-Report_2025-06-28_Daniel.pdf"),
+]
+
+
+@pytest.fixture(autouse=True)
+def _repo_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+class FakeToolLLM:
+    """
+    Stands in for the tool-bound assessment LLM: asks for calculate_metrics_for_subjects
+    with the subjects from the prompt, then stops once the tool has answered.
+    """
+
+    def __init__(self, delay: float = 0.01):
+        self.calls = 0
+        self.delay = delay
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        from langchain_core.messages import AIMessage, ToolMessage
+
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="All subjects assessed.")
+        prompt = messages[0].content
+        grade = re.search(r"- Grade: (.*)", prompt).group(1).strip()
+        subjects_json = prompt.split("- Subject Scores:", 1)[1].split("**IMPORTANT", 1)[0].strip()
+        return AIMessage(content="", tool_calls=[{
+            "name": "calculate_metrics_for_subjects",
+            "args": {"subjects_json": subjects_json, "current_grade": grade},
+            "id": f"call_{self.calls}",
+        }])
+
+
+class FakeStructuredLLM:
+    """Stands in for a structured-output LLM; overview and summary name the student from the prompt."""
+
+    def __init__(self, schema, fail_times: int = 0):
+        self.schema = schema
+        self.calls = 0
+        self.fail_times = fail_times
+
+    async def ainvoke(self, prompt, config=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.calls <= self.fail_times:
+            raise RuntimeError("LLM unavailable")
+        fields = self.schema.model_fields
+        if "mappings" in fields:
+            return self.schema(mappings=[])
+        name = re.search(r"section of (.*?)'s assessment report", prompt).group(1)
+        return self.schema(**{field: f"<p>Written for {name}.</p>" for field in fields})
+
+
+class FakeLLMs:
+    """Registry of the fakes handed out by the patched get_tool_llm / get_structured_llm."""
+
+    def __init__(self):
+        self.tool = FakeToolLLM()
+        self.structured = {}
+        self.fail_times = {}
+
+    def get_tool_llm(self, tools):
+        return self.tool
+
+    def get_structured_llm(self, schema):
+        if schema not in self.structured:
+            self.structured[schema] = FakeStructuredLLM(schema, self.fail_times.get(schema.__name__, 0))
+        return self.structured[schema]
+
+    def calls(self, schema_name: str) -> int:
+        return sum(llm.calls for schema, llm in self.structured.items() if schema.__name__ == schema_name)
+
+
+@pytest.fixture
+def fake_llms(monkeypatch, tmp_path):
+    """
+    Patches the LLM factories used by build_graph with fakes and keeps the run's
+    persistent state (node cache, alias table, checkpoints) in tmp_path.
+    """
+    import build_graph
+    import checkpoints
+    import subject_matcher
+    from sqlite_cache import SQLiteCache
+
+    fakes = FakeLLMs()
+    node_cache = SQLiteCache(str(tmp_path / "node_results.sqlite"), table="node_results")
+    monkeypatch.setattr(build_graph, "get_node_cache", lambda: node_cache)
+    monkeypatch.setattr(build_graph, "get_tool_llm", fakes.get_tool_llm)
+    monkeypatch.setattr(build_graph, "get_structured_llm", fakes.get_structured_llm)
+    monkeypatch.setattr(subject_matcher, "_alias_table", subject_matcher.AliasTable(str(tmp_path / "aliases.json")))
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_PATH", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setattr(build_graph, "_shared_assessment", None)
+    monkeypatch.setattr(build_graph, "_shared_assessment_lock", asyncio.Lock())
+    return fakes
+
+
+def report_html(final_state) -> str:
+    return final_state["messages"][-1].content
+
+
+def read_pdf(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+from build_graph import DETERMINISTIC_ASSESSMENT, StudentAssessment
+from conftest import PDF_PATHS, FakeToolLLM, report_html
+
+
+class TamperingToolLLM(FakeToolLLM):
+    """Tool LLM that drops the first subject and inflates a score in its tool call."""
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        response = await super().ainvoke(messages, config, **kwargs)
+        for call in response.tool_calls:
+            subjects = json.loads(call["args"]["subjects_json"])[1:]
+            subjects[0]["score"] += 300
+            call["args"]["subjects_json"] = json.dumps(subjects)
+        return response
+
+
+def _run(agent: StudentAssessment, *args, **kwargs):
+    return asyncio.run(agent.run_from_pdf(*args, **kwargs))
+
+
+def test_llm_mode_metrics_come_from_mapped_subjects(fake_llms):
+    fake_llms.tool = TamperingToolLLM()
+    llm_state = _run(StudentAssessment(use_node_cache=False), PDF_PATHS[0], "4", "Avery")
+    deterministic_state = _run(StudentAssessment(use_node_cache=False), PDF_PATHS[0], "4", "Avery",
+                               assessment_mode=DETERMINISTIC_ASSESSMENT)
+
+    assert fake_llms.tool.calls == 2
+    mapped = {s["subject"]: s["score"] for s in json.loads(llm_state["subjects_json"])}
+    assert {name: m.score for name, m in llm_state["metrics"].items()} == mapped
+    assert llm_state["metrics"] == deterministic_state["metrics"]
@@ -0,0 +1,97 @@
+import asyncio
+import sqlite3
+
+import build_graph
+
+from build_graph import DETERMINISTIC_ASSESSMENT, LLM_ASSESSMENT, ReportSummary, StudentAssessment
+from checkpoints import open_run_checkpoints, run_id
+from ixl_extractor import RuleBasedExtraction
+from conftest import PDF_PATHS, read_pdf, report_html
+
+
+def _agent() -> StudentAssessment:
+    return StudentAssessment(use_node_cache=False, use_checkpoints=True)
+
+
+def test_pdf_bytes_are_not_checkpointed(fake_llms, tmp_path):
+    pdf = read_pdf(PDF_PATHS[0])
+    final_state = asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    assert "Avery" in report_html(final_state)
+    assert "pdf_bytes" not in final_state
+
+    with sqlite3.connect(str(tmp_path / "checkpoints.sqlite")) as conn:
+        blobs = [row[0] for row in conn.execute("SELECT checkpoint FROM checkpoints")]
+        blobs += [row[0] for row in conn.execute("SELECT value FROM writes") if row[0] is not None]
+    assert blobs
+    # Neither the buffer nor any sizeable piece of it was written
+    assert not any(pdf[1000:1064] in bytes(blob) for blob in blobs)
+
+
+def test_failed_run_resumes_from_last_completed_node(fake_llms):
+    fake_llms.fail_times["ReportSummary"] = 1
+    pdf = read_pdf(PDF_PATHS[0])
+
+    try:
+        asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("the first run should fail in synthesis")
+    assert fake_llms.tool.calls == 2
+
+    final_state = asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    # Parsing, mapping and the tool loop were restored, only synthesis ran again
+    assert fake_llms.tool.calls == 2
+    assert fake_llms.calls("ReportSummary") == 2
+    assert "Written for Avery." in report_html(final_state)
+
+
+def test_run_without_a_report_is_not_replayed(fake_llms, monkeypatch, tmp_path):
+    pdf = read_pdf(PDF_PATHS[0])
+    extract_ixl_scores = build_graph.extract_ixl_scores
+    parse_pdf_to_text_async = build_graph.parse_pdf_to_text_async
+
+    async def parse_failed(pdf_source):
+        return None
+
+    # A temporary parsing failure: no subjects are extracted and the graph ends early
+    monkeypatch.setattr(build_graph, "extract_ixl_scores", lambda pdf_source: RuleBasedExtraction(confident=False))
+    monkeypatch.setattr(build_graph, "parse_pdf_to_text_async", parse_failed)
+    final_state = asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    assert not final_state["student_performance_data"]
+    with sqlite3.connect(str(tmp_path / "checkpoints.sqlite")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM assessment_runs").fetchone()[0] == 0
+
+    monkeypatch.setattr(build_graph, "extract_ixl_scores", extract_ixl_scores)
+    monkeypatch.setattr(build_graph, "parse_pdf_to_text_async", parse_pdf_to_text_async)
+    final_state = asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    assert fake_llms.tool.calls == 2
+    assert "Written for Avery." in report_html(final_state)
+
+
+def test_run_in_progress_elsewhere_is_not_resumed(fake_llms, tmp_path):
+    fake_llms.fail_times["ReportSummary"] = 1
+    pdf = read_pdf(PDF_PATHS[0])
+    try:
+        asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    except RuntimeError:
+        pass
+
+    async def mark_running():
+        async with open_run_checkpoints() as checkpoints:
+            assert not await checkpoints.is_running(run_id(pdf, "4", "Avery", LLM_ASSESSMENT))
+            # e.g. another process picked the failed run up
+            await checkpoints.mark(run_id(pdf, "4", "Avery", LLM_ASSESSMENT), "running")
+
+    asyncio.run(mark_running())
+    final_state = asyncio.run(_agent().run_from_pdf_bytes(pdf, "4", "Avery"))
+    # Nothing was restored from the other run's checkpoints
+    assert fake_llms.tool.calls == 4
+    assert "Written for Avery." in report_html(final_state)
+    with sqlite3.connect(str(tmp_path / "checkpoints.sqlite")) as conn:
+        assert conn.execute("SELECT status FROM assessment_runs").fetchall() == [("running",)]
+
+
+def test_run_id_depends_on_assessment_mode():
+    pdf = read_pdf(PDF_PATHS[0])
+    assert run_id(pdf, "4", "Avery", LLM_ASSESSMENT) != run_id(pdf, "4", "Avery", DETERMINISTIC_ASSESSMENT)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from cohort import (ABOVE_GRADE_LEVEL, BELOW_GRADE_LEVEL, NO_DATA, ON_GRADE_LEVEL, build_cohort_table,
+                    cohort_summary, score_cohort)
+from grade_reader import get_benchmark_index, grade_sort_key
+from report_formatter import IXL_NORMS_LINK, format_cohort_report
+from tools import calculate_next_grade_threshold, calculate_percentile, calculate_performing_grade
+
+GRADES = ["K"] + [str(g) for g in range(1, 13)]
+
+
+def _sample_cohort(rows: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    subjects = list(get_benchmark_index().subjects)
+    return build_cohort_table(
+        {
+            "student_name": f"Student {rng.integers(60)}",
+            "grade": GRADES[rng.integers(len(GRADES))],
+            "subject": subjects[rng.integers(len(subjects))],
+            "score": int(rng.integers(0, 1300)),
+        }
+        for _ in range(rows)
+    )
+
+
+def _as_number(text: str) -> int:
+    return int(text.split("th")[0]) if text[0].isdigit() else -1
+
+
+def test_score_cohort_matches_single_row_tools():
+    scored = score_cohort(_sample_cohort())
+    for row in scored.itertuples(index=False):
+        subject, score, grade = str(row.subject), int(row.score), str(row.grade)
+        assert row.percentile == _as_number(calculate_percentile(subject, score, grade))
+        assert row.next_grade_threshold == _as_number(calculate_next_grade_threshold(subject, grade))
+        performing_grade = calculate_performing_grade(subject, score, grade)
+        if row.performing_grade is None:
+            assert performing_grade.startswith("No 70th percentile data")
+        else:
+            assert str(row.performing_grade) == performing_grade
+            expected = (ABOVE_GRADE_LEVEL if grade_sort_key(performing_grade) > grade_sort_key(grade)
+                        else ON_GRADE_LEVEL if grade_sort_key(performing_grade) == grade_sort_key(grade)
+                        else BELOW_GRADE_LEVEL)
+            assert row.grade_level_band == expected
+
+
+def test_cohort_summary_counts():
+    scored = score_cohort(_sample_cohort())
+    summary = cohort_summary(scored)
+
+    assert summary["rows"] == len(scored)
+    assert summary["students"] == scored["student_name"].nunique()
+    assert summary["norms_version"] == get_benchmark_index().version
+
+    counts = summary["grade_level_counts"]
+    assert list(counts.columns) == [ABOVE_GRADE_LEVEL, ON_GRADE_LEVEL, BELOW_GRADE_LEVEL, NO_DATA]
+    assert counts.to_numpy().sum() == len(scored)
+
+    has_data = scored[scored["percentile"] >= 0]
+    for subject, group in has_data.groupby("subject", observed=True):
+        stats = summary["subjects"].loc[subject]
+        assert stats["students"] == group["student_name"].nunique()
+        assert stats["mean_score"] == round(group["score"].mean(), 1)
+        assert stats["median_percentile"] == round(group["percentile"].median(), 1)
+        assert summary["percentile_distribution"].loc[subject].sum() == len(group)
+
+
+def test_cohort_report_cites_the_norms():
+    summary = cohort_summary(score_cohort(_sample_cohort(20)))
+    assert IXL_NORMS_LINK in format_cohort_report(summary, "Class 4B", "June 1, 2025")
@@ -0,0 +1,88 @@
+import asyncio
+
+from pydantic import BaseModel
+
+from build_graph import StudentAssessment
+from conftest import PDF_PATHS, report_html
+from node_cache import node_cache_key
+from sqlite_cache import SQLiteCache
+from tools import calculate_all_metrics, calculate_metrics_for_subjects
+
+
+class FakeLLM:
+    """Structured-output stand-in that counts its calls."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def ainvoke(self, llm_input, config=None, **kwargs):
+        self.calls += 1
+        return self.result
+
+
+def _schema_v1():
+    class ReportOverview(BaseModel):
+        overview: str
+    return ReportOverview
+
+
+def _schema_v2():
+    class ReportOverview(BaseModel):
+        overview: str
+        tone: str
+    return ReportOverview
+
+
+def test_key_covers_schema_definition_and_tools():
+    v1, v2 = _schema_v1(), _schema_v2()
+    assert node_cache_key("synthesis_overview", "prompt", v1) == node_cache_key("synthesis_overview", "prompt", _schema_v1())
+    # Same schema name, different fields
+    assert node_cache_key("synthesis_overview", "prompt", v1) != node_cache_key("synthesis_overview", "prompt", v2)
+    assert node_cache_key("assessment", "prompt", tools=[calculate_metrics_for_subjects]) != node_cache_key(
+        "assessment", "prompt", tools=[calculate_metrics_for_subjects, calculate_all_metrics]
+    )
+
+
+def test_identical_call_is_served_from_cache(tmp_path):
+    agent = StudentAssessment(use_node_cache=False)
+    agent.node_cache = SQLiteCache(str(tmp_path / "nodes.sqlite"), table="node_results")
+    schema = _schema_v1()
+    llm = FakeLLM(schema(overview="Strong reader."))
+
+    first = asyncio.run(agent._ainvoke_cached("synthesis_overview", llm, "prompt", schema))
+    second = asyncio.run(agent._ainvoke_cached("synthesis_overview", llm, "prompt", schema))
+    assert llm.calls == 1
+    assert first == second
+
+
+def test_entry_that_no_longer_validates_is_a_miss(tmp_path):
+    agent = StudentAssessment(use_node_cache=False)
+    agent.node_cache = SQLiteCache(str(tmp_path / "nodes.sqlite"), table="node_results")
+    schema = _schema_v2()
+    # An entry written in an older format under the current key
+    agent.node_cache.put(node_cache_key("synthesis_overview", "prompt", schema), {"overview": "Old."})
+    llm = FakeLLM(schema(overview="New.", tone="warm"))
+
+    result = asyncio.run(agent._ainvoke_cached("synthesis_overview", llm, "prompt", schema))
+    assert llm.calls == 1
+    assert result.overview == "New."
+    # The fresh result replaced the stale entry
+    asyncio.run(agent._ainvoke_cached("synthesis_overview", llm, "prompt", schema))
+    assert llm.calls == 1
+
+
+def test_rerun_is_served_from_node_cache(fake_llms):
+    agent = StudentAssessment()
+    first = asyncio.run(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery"))
+    assert (fake_llms.tool.calls, fake_llms.calls("ReportSummary")) == (2, 1)
+
+    second = asyncio.run(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery"))
+    assert (fake_llms.tool.calls, fake_llms.calls("ReportSummary")) == (2, 1)
+    assert second["metrics"] == first["metrics"]
+    assert "Written for Avery." in report_html(second)
+
+    # A corrected name changes the assessment and synthesis prompts, so those run again
+    renamed = asyncio.run(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery B."))
+    assert (fake_llms.tool.calls, fake_llms.calls("ReportSummary")) == (4, 2)
+    assert "Written for Avery B.." in report_html(renamed)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pdf_parser
+from conftest import PDF_PATHS
+from pdf_parser import EnhancedPDFParser
+
+
+class FakeLlamaParse:
+    """Replaces the LlamaParse call with a job that runs until it is cancelled (or returns after delay)."""
+
+    def __init__(self, delay: float = 30.0, text: str = "llamaparse text"):
+        self.delay = delay
+        self.text = text
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self, source):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.text
+
+
+def _patch(monkeypatch, fake):
+    monkeypatch.setattr(EnhancedPDFParser, "_parse_with_llamaparse", fake)
+    monkeypatch.setattr(pdf_parser, "_llamaparse_jobs", 0)
+
+
+def test_llamaparse_job_is_cancelled_when_pymupdf_suffices(monkeypatch):
+    fake = FakeLlamaParse()
+    _patch(monkeypatch, fake)
+
+    result = asyncio.run(EnhancedPDFParser().parse_pdf_report_async(PDF_PATHS[0]))
+    assert result["backends"]["llamaparse"]["status"] == "skipped"
+    assert (fake.started, fake.cancelled) == (1, 1)
+    assert pdf_parser._llamaparse_jobs == 0
+
+
+def test_llamaparse_job_is_cancelled_at_its_deadline(monkeypatch):
+    fake = FakeLlamaParse()
+    _patch(monkeypatch, fake)
+    parser = EnhancedPDFParser(llamaparse_timeout=0.05, skip_llamaparse_when_sufficient=False)
+
+    result = asyncio.run(parser.parse_pdf_report_async(PDF_PATHS[0]))
+    assert result["backends"]["llamaparse"]["status"] == "timeout"
+    assert result["contributors"] == ["pymupdf"]
+    assert fake.cancelled == 1
+    assert pdf_parser._llamaparse_jobs == 0
+
+
+def test_llamaparse_result_is_used_within_deadline(monkeypatch):
+    fake = FakeLlamaParse(delay=0.01)
+    _patch(monkeypatch, fake)
+    parser = EnhancedPDFParser(skip_llamaparse_when_sufficient=False)
+
+    with open(PDF_PATHS[0], "rb") as f:
+        result = asyncio.run(parser.parse_pdf_report_async(f.read()))
+    assert result["llamaparse"] == "llamaparse text"
+    assert result["contributors"] == ["pymupdf", "llamaparse"]
+    assert pdf_parser._llamaparse_jobs == 0
+
+
+def test_llamaparse_is_not_queued_when_all_slots_are_busy(monkeypatch):
+    fake = FakeLlamaParse(delay=0.01)
+    _patch(monkeypatch, fake)
+    monkeypatch.setattr(pdf_parser, "_llamaparse_jobs", pdf_parser.LLAMAPARSE_MAX_JOBS)
+    parser = EnhancedPDFParser(skip_llamaparse_when_sufficient=False)
+
+    result = asyncio.run(parser.parse_pdf_report_async(PDF_PATHS[0]))
+    assert result["backends"]["llamaparse"]["status"] == "busy"
+    assert fake.started == 0
+    assert result["pymupdf"]
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+import rate_limiter
+from rate_limiter import LLMRateLimiter, RateLimitedLLM
+
+
+class FakeToolModel(FakeListChatModel):
+    """Fake chat model that accepts bind_tools, so with_structured_output works on it."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+
+class Answer(BaseModel):
+    text: str
+
+
+def test_chained_runnables_stay_rate_limited():
+    limiter = LLMRateLimiter()
+    llm = RateLimitedLLM(FakeToolModel(responses=["a"] * 10), limiter)
+
+    async def run():
+        await llm.ainvoke("hi")
+        await llm.with_config(tags=["test"]).ainvoke("hi")
+        await llm.bind_tools([Answer]).ainvoke("hi")
+        await llm.with_structured_output(Answer, include_raw=True).ainvoke("hi")
+
+    asyncio.run(run())
+    assert isinstance(llm.bind_tools([Answer]), RateLimitedLLM)
+    assert isinstance(llm.with_structured_output(Answer), RateLimitedLLM)
+    assert limiter.stats()["calls"] == 4
+
+
+def test_throttled_call_is_retried_and_halves_the_window(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE_SECONDS", 0.0)
+    limiter = LLMRateLimiter(initial_concurrency=8, max_concurrency=16, max_attempts=3)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return AIMessage(content="ok")
+
+    result = asyncio.run(limiter.run(call, "prompt"))
+    stats = limiter.stats()
+    assert result.content == "ok"
+    assert len(attempts) == 2
+    assert (stats["throttled"], stats["retries"], stats["failed"]) == (1, 1, 0)
+    # Halved on the throttle, then one additive step for the success
+    assert stats["window"] == pytest.approx(4 + 1 / 4, abs=0.01)
+    assert stats["in_flight"] == 0
+
+
+def test_other_errors_are_not_retried():
+    limiter = LLMRateLimiter(max_attempts=3)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.run(call, "prompt"))
+    assert len(attempts) == 1
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_concurrency_window_caps_calls_in_flight():
+    limiter = LLMRateLimiter(initial_concurrency=2, max_concurrency=2)
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return AIMessage(content="ok")
+
+    async def run():
+        return await asyncio.gather(*(limiter.run(call, "prompt") for _ in range(8)))
+
+    assert len(asyncio.run(run())) == 8
+    assert peak == 2
+    assert limiter.stats()["calls"] == 8
+
+
+def test_invoke_works_inside_a_running_event_loop():
+    limiter = LLMRateLimiter()
+    llm = RateLimitedLLM(FakeToolModel(responses=["a"]), limiter)
+
+    async def run():
+        # e.g. a sync helper called from an async handler
+        return llm.invoke("hi")
+
+    assert asyncio.run(run()).content == "a"
+    assert limiter.stats()["calls"] == 1
+
+
+def test_sync_calls_from_threads_share_the_window_and_retry(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BACKOFF_BASE_SECONDS", 0.0)
+    limiter = LLMRateLimiter(initial_concurrency=2, max_concurrency=2)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    throttled = []
+
+    def call():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            throttle = not throttled
+            throttled.append(1)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        if throttle:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return AIMessage(content="ok")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: limiter.run_sync(call, "prompt"), range(8)))
+
+    stats = limiter.stats()
+    assert [r.content for r in results] == ["ok"] * 8
+    assert peak == 2
+    assert (stats["calls"], stats["retries"], stats["in_flight"], stats["queued"]) == (8, 1, 0, 0)
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from build_graph import StudentAssessment
+from conftest import PDF_PATHS, report_html
+
+
+def _agent() -> StudentAssessment:
+    return StudentAssessment(use_node_cache=False)
+
+
+def test_identical_concurrent_runs_share_one_run(fake_llms):
+    agent = _agent()
+
+    async def run_all():
+        return await asyncio.gather(*(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery") for _ in range(5)))
+
+    results = asyncio.run(run_all())
+    assert fake_llms.tool.calls == 2
+    assert all(report_html(r) == report_html(results[0]) for r in results)
+    # Each caller gets its own top-level dict
+    assert len({id(r) for r in results}) == len(results)
+    assert agent.in_flight_runs == {}
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_run(fake_llms):
+    fake_llms.tool.delay = 0.2
+    agent = _agent()
+
+    async def run():
+        first = asyncio.create_task(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery"))
+        second = asyncio.create_task(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery"))
+        await asyncio.sleep(0.1)
+        (shared,) = agent.in_flight_runs.values()
+        assert shared.waiters == 2
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        final_state = await second
+        return shared, final_state
+
+    shared, final_state = asyncio.run(run())
+    assert not shared.task.cancelled()
+    assert "Written for Avery." in report_html(final_state)
+    assert fake_llms.tool.calls == 2
+
+
+def test_run_is_cancelled_once_no_caller_waits(fake_llms):
+    fake_llms.tool.delay = 0.2
+    agent = _agent()
+
+    async def run():
+        callers = [asyncio.create_task(agent.run_from_pdf(PDF_PATHS[0], "4", "Avery")) for _ in range(2)]
+        await asyncio.sleep(0.1)
+        (shared,) = agent.in_flight_runs.values()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        with pytest.raises(asyncio.CancelledError):
+            await shared.task
+        return shared
+
+    shared = asyncio.run(run())
+    assert shared.task.cancelled()
+    assert agent.in_flight_runs == {}
+    assert fake_llms.calls("ReportSummary") == 0
+
+
+def test_different_students_are_not_coalesced(fake_llms):
+    agent = _agent()
+
+    async def run_all():
+        return await asyncio.gather(
+            agent.run_from_pdf(PDF_PATHS[0], "4", "Avery"),
+            agent.run_from_pdf(PDF_PATHS[0], "4", "Blake"),
+        )
+
+    avery, blake = asyncio.run(run_all())
+    assert fake_llms.tool.calls == 4
+    assert "Written for Avery." in report_html(avery)
+    assert "Written for Blake." in report_html(blake)
+
+
+def test_identical_concurrent_streams_share_one_run(fake_llms):
+    agent = _agent()
+
+    async def collect():
+        return [event async for event in agent.stream_from_pdf(PDF_PATHS[0], "4", "Avery")]
+
+    async def run_all():
+        return await asyncio.gather(collect(), collect())
+
+    first, second = asyncio.run(run_all())
+    assert fake_llms.tool.calls == 2
+    assert fake_llms.calls("ReportSummary") == 1
+    # Every caller receives every event
+    assert first == second
+    assert first[-1].final and "Written for Avery." in first[-1].report_html
+    assert agent.in_flight_runs == {}
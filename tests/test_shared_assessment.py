@@ -0,0 +1,40 @@
+import asyncio
+import itertools
+
+from build_graph import get_student_assessment
+from conftest import PDF_PATHS, read_pdf, report_html
+
+NAMES = ["Avery", "Blake", "Casey", "Devon", "Emery", "Finley", "Harper", "Jordan", "Kendall", "Logan", "Morgan", "Quinn"]
+GRADES = ["3", "4", "5", "10"]
+
+
+def test_concurrent_runs_through_the_shared_instance_stay_isolated(fake_llms):
+    runs = [
+        (name, grade, pdf)
+        for name, grade, pdf in zip(NAMES, itertools.cycle(GRADES), itertools.cycle(PDF_PATHS))
+    ]
+
+    async def run_all():
+        agents = await asyncio.gather(*(get_student_assessment() for _ in range(4)))
+        assert all(agent is agents[0] for agent in agents)
+        agent = agents[0]
+        agent.node_cache = None
+        calls = [
+            # Every other run comes in as bytes, to cover both entry points
+            agent.run_from_pdf_bytes(read_pdf(pdf), grade, name) if i % 2 else agent.run_from_pdf(pdf, grade, name)
+            for i, (name, grade, pdf) in enumerate(runs)
+        ]
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(run_all())
+
+    # One tool round trip per run: no run was coalesced with or leaked into another
+    assert fake_llms.tool.calls == 2 * len(runs)
+    for (name, grade, _), final_state in zip(runs, results):
+        assert final_state["student_name"] == name
+        assert final_state["grade"] == grade
+        html = report_html(final_state)
+        assert f"<strong>Student:</strong> {name}" in html
+        assert f"<strong>Grade:</strong> {grade}" in html
+        assert f"Written for {name}." in html
+        assert not any(other in html for other in NAMES if other != name)
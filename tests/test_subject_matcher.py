@@ -0,0 +1,46 @@
+from grade_reader import get_benchmark_index
+from subject_matcher import AliasTable, confirmed_by_ranker, match_subject
+from tools import calculate_percentile, calculate_next_grade_threshold
+
+
+def test_high_school_grade_maps_and_scores():
+    subjects = get_benchmark_index().subjects
+    match = match_subject("Math: Overall", subjects, "10")
+    assert match.official_subject.startswith("High School")
+
+    # The norms label the column 'Grade 10'; the student's bare grade must find it
+    percentile = calculate_percentile(match.official_subject, 600, "10")
+    assert not percentile.startswith("No data")
+    assert percentile == calculate_percentile(match.official_subject, 600, "Grade 10")
+    assert calculate_next_grade_threshold(match.official_subject, "10").isdigit()
+
+
+def test_k8_grade_maps_to_k8_title():
+    subjects = get_benchmark_index().subjects
+    match = match_subject("Math: Overall", subjects, "4")
+    assert match.official_subject == "End-of-Year Math: Overall (K-8)"
+    assert calculate_percentile(match.official_subject, 600, "4") == "95th percentile"
+
+
+def test_only_ranker_confirmed_llm_answers_are_learned():
+    subjects = get_benchmark_index().subjects
+    # 'Overall reading level' ties between Reading Level and ELA Overall; the LLM breaks the tie
+    assert confirmed_by_ranker("Overall reading level", "End-of-Year ELA: Reading Level (K-8)", subjects)
+    # A wrong guess for an unrelated subject is not confirmed
+    assert not confirmed_by_ranker("Science", "End-of-Year Math: Fractions (K-8)", subjects)
+    assert not confirmed_by_ranker("Fractions", "End-of-Year Math: Geometry (K-8)", subjects)
+    assert not confirmed_by_ranker("Fractions", "Not An Official Subject", subjects)
+
+
+def test_unconfirmed_alias_is_not_used(tmp_path):
+    subjects = get_benchmark_index().subjects
+    aliases = AliasTable(str(tmp_path / "aliases.json"))
+    # An alias saved before learning was gated, mapping to a subject the ranker disagrees with
+    aliases.learn({"Spelling": "End-of-Year Math: Geometry (K-8)",
+                   "Overall reading level": "End-of-Year ELA: Reading Level (K-8)"})
+
+    stale = match_subject("Spelling", subjects, "4", AliasTable(aliases.path))
+    assert stale.source == "fuzzy" and not stale.confident
+
+    learned = match_subject("Overall reading level", subjects, "4", AliasTable(aliases.path))
+    assert learned.source == "alias" and learned.official_subject == "End-of-Year ELA: Reading Level (K-8)"
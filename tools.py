@@ -1,8 +1,107 @@
 import re
-import pandas as pd
-from grade_reader import get_grade_data
+import json
+import numpy as np
+from grade_reader import get_benchmark_index, pinned_benchmark_index, BENCHMARK_PERCENTILE
 import traceback
+from typing import TYPE_CHECKING
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _score_rows(subjects, scores, grades, index=None) -> dict:
+    """Vectorized core shared by calculate_metrics_batch and the single-row tools.
+
+    Returns a dict of equally long NumPy arrays:
+    - percentile: highest percentile reached, 0 if none, -1 if no data for the subject/grade
+    - performing_grade: grade label, or None if the subject has no 70th percentile data
+    - next_grade_threshold: 70th percentile score for the grade, -1 if unavailable
+    - has_grade_data / has_benchmark: availability flags for error reporting
+    """
+    index = index or get_benchmark_index()
+    subjects = list(subjects)
+    grades = [str(g) for g in grades]
+    scores = np.asarray(scores, dtype=np.int64)
+
+    pair_ids = index.pair_ids(subjects, grades)
+    subject_ids = index.subject_ids(subjects)
+    has_benchmark = index.batch_has_benchmark(subject_ids)
+
+    # Grade defaults to the student's current grade when no benchmark grade is reached
+    performing_grade = index.batch_performing_grades(subject_ids, scores)
+    not_reached = has_benchmark & np.equal(performing_grade, None)
+    performing_grade[not_reached] = np.asarray(grades, dtype=object)[not_reached]
+
+    return {
+        "percentile": index.batch_percentiles(pair_ids, scores),
+        "performing_grade": performing_grade,
+        "next_grade_threshold": index.batch_benchmark_scores(pair_ids, BENCHMARK_PERCENTILE),
+        "has_grade_data": pair_ids >= 0,
+        "has_benchmark": has_benchmark,
+    }
+
+
+def calculate_metrics_batch(subjects, scores, grades) -> "pd.DataFrame":
+    """Calculates percentile, performing grade, and next grade threshold for many rows at once.
+
+    All lookups are answered with np.searchsorted against the process-wide
+    BenchmarkIndex, so scoring thousands of (student, subject) rows is a single
+    vectorized call rather than one pandas filter per row.
+
+    Args:
+        subjects: Official subject names, one per row.
+        scores: Student scores, one per row.
+        grades: Current grade levels (e.g., '4'), one per row.
+
+    Returns:
+        A DataFrame with columns Subject, Score, Grade, Percentile, PerformingGrade
+        and NextGradeThreshold. Percentile and NextGradeThreshold are -1 and
+        PerformingGrade is None where the benchmark data has no answer. The norms
+        version used is stored in frame.attrs['norms_version'].
+    """
+    import pandas as pd
+
+    subjects = list(subjects)
+    grades = [str(g) for g in grades]
+    if not (len(subjects) == len(scores) == len(grades)):
+        raise ValueError("subjects, scores and grades must have the same length")
+
+    index = get_benchmark_index()
+    metrics = _score_rows(subjects, scores, grades, index)
+    frame = pd.DataFrame({
+        'Subject': subjects,
+        'Score': np.asarray(scores, dtype=np.int64),
+        'Grade': grades,
+        'Percentile': metrics['percentile'],
+        'PerformingGrade': metrics['performing_grade'],
+        'NextGradeThreshold': metrics['next_grade_threshold'],
+    })
+    frame.attrs['norms_version'] = index.version
+    return frame
+
+
+def _percentile_text(metrics: dict, i: int, subject: str, current_grade: str) -> str:
+    """Formats row i of _score_rows output as the calculate_percentile result."""
+    if not metrics['has_grade_data'][i]:
+        return f"No data found for Subject '{subject}' and Grade '{current_grade}'"
+    # Highest percentile the student has achieved; 0 when below the lowest benchmark
+    return f"{metrics['percentile'][i]}th percentile"
+
+def _performing_grade_text(metrics: dict, i: int, subject: str) -> str:
+    """Formats row i of _score_rows output as the calculate_performing_grade result."""
+    if not metrics['has_benchmark'][i]:
+        return f"No 70th percentile data found for Subject '{subject}'"
+    return str(metrics['performing_grade'][i])
+
+def _next_grade_threshold_text(metrics: dict, i: int, subject: str, current_grade: str) -> str:
+    """Formats row i of _score_rows output as the calculate_next_grade_threshold result."""
+    if not metrics['has_grade_data'][i]:
+        return f"Error: No benchmark data found for {subject} in grade {current_grade}"
+    next_grade_threshold = metrics['next_grade_threshold'][i]
+    if next_grade_threshold < 0:
+        # If 70th percentile is missing, it's a data gap.
+        return "N/A (No 70th percentile benchmark for this grade)"
+    return str(next_grade_threshold)
 
 def calculate_percentile(subject: str, student_score: int, current_grade: str) -> str:
     """Calculates the exact percentile for a given score, subject, and grade.
@@ -16,28 +115,8 @@ def calculate_percentile(subject: str, student_score: int, current_grade: str) -
         A string representing the calculated percentile (e.g., "75th percentile").
     """
     try:
-        grade_df = get_grade_data()
-        
-        # Robust filtering by converting both sides to string
-        subject_grade_data = grade_df[
-            (grade_df['Subject'] == subject) & 
-            (grade_df['Grade'].astype(str) == str(current_grade))
-        ]
-
-        if subject_grade_data.empty:
-            return f"No data found for Subject '{subject}' and Grade '{current_grade}'"
-        
-        # Find all percentiles where the student's score is >= the benchmark score
-        qualifying_percentiles = subject_grade_data[subject_grade_data['Score'] <= student_score]
-
-        if qualifying_percentiles.empty:
-            return "0th percentile" # Score is below the lowest benchmark
-
-        # The highest percentile the student has achieved
-        # Ensure the 'Percentile' column is numeric before finding the max
-        highest_percentile = pd.to_numeric(qualifying_percentiles['Percentile']).max()
-        
-        return f"{highest_percentile}th percentile"
+        metrics = _score_rows([subject], [student_score], [current_grade])
+        return _percentile_text(metrics, 0, subject, current_grade)
         
     except Exception as e:
         return f"Error calculating percentile: {str(e)}"
@@ -46,7 +125,7 @@ def calculate_performing_grade(subject: str, student_score: int, current_grade:
     """Calculates the highest grade level at which the student is performing.
 
     This is determined by finding the highest grade where the student's score
-    meets or exceeds the 80th percentile benchmark for that grade.
+    meets or exceeds the 70th percentile benchmark for that grade.
     
     Args:
         subject: The official subject name from the benchmark data.
@@ -57,36 +136,8 @@ def calculate_performing_grade(subject: str, student_score: int, current_grade:
         A string representing the student's performing grade level (e.g., '5th Grade').
     """
     try:
-        grade_df = get_grade_data()
-        
-        # Filter for the specific subject and the 85th percentile benchmark
-        # Use .copy() to avoid the SettingWithCopyWarning
-        benchmark_data = grade_df[
-            (grade_df['Subject'] == subject) & 
-            (grade_df['Percentile'] == 70)
-        ].copy()
-
-        if benchmark_data.empty:
-            return f"No 70th percentile data found for Subject '{subject}'"
-
-        # Ensure grade column is string before sorting
-        benchmark_data['Grade'] = benchmark_data['Grade'].astype(str)
-        
-        # Sort grades in the correct order (K, 1, 2, ..., 12)
-        grade_order = ['K'] + [str(i) for i in range(1, 13)]
-        benchmark_data['Grade'] = pd.Categorical(benchmark_data['Grade'], categories=grade_order, ordered=True)
-        benchmark_data = benchmark_data.sort_values('Grade')
-        
-        # Find the highest grade where the student's score meets or exceeds the benchmark
-        performing_grade = current_grade # Default to current grade
-        for _, row in benchmark_data.iterrows():
-            if not pd.isna(row['Score']) and student_score >= row['Score']:
-                performing_grade = row['Grade']
-            else:
-                # Since the grades are sorted, we can stop once the score is too low
-                break
-        
-        return performing_grade
+        metrics = _score_rows([subject], [student_score], [current_grade])
+        return _performing_grade_text(metrics, 0, subject)
         
     except Exception as e:
         return f"Error calculating performing grade: {str(e)}"
@@ -104,27 +155,8 @@ def calculate_next_grade_threshold(subject: str, current_grade: str) -> str:
         A string representing the numerical score required to reach the next grade threshold.
     """
     try:
-        benchmark_data = get_grade_data()
-        
-        # Robust filtering by converting both sides to string
-        grade_data = benchmark_data[
-            (benchmark_data['Subject'] == subject) & 
-            (benchmark_data['Grade'].astype(str) == str(current_grade))
-        ]
-        
-        if grade_data.empty:
-            return f"Error: No benchmark data found for {subject} in grade {current_grade}"
-        
-        # Get the 70th percentile score for the current grade
-        threshold_data = grade_data[grade_data['Percentile'] == 70]
-        
-        if threshold_data.empty:
-            # If 70th percentile is missing, it's a data gap.
-            return "N/A (No 70th percentile benchmark for this grade)"
-        
-        next_grade_threshold = threshold_data['Score'].iloc[0]
-        
-        return str(next_grade_threshold)
+        metrics = _score_rows([subject], [0], [current_grade])
+        return _next_grade_threshold_text(metrics, 0, subject, current_grade)
         
     except Exception as e:
         traceback.print_exc()
@@ -142,18 +174,58 @@ def calculate_all_metrics(subject: str, student_score: int, current_grade: str)
         A string with all three metrics: percentile, performing grade, and next grade threshold.
     """
     try:
-        # Call all three existing functions
-        percentile = calculate_percentile(subject, student_score, current_grade)
-        performing_grade = calculate_performing_grade(subject, student_score, current_grade)
-        next_threshold = calculate_next_grade_threshold(subject, current_grade)
+        # Call all three existing functions against one norms snapshot, so a hot
+        # reload in the middle of this call cannot mix two norms versions
+        with pinned_benchmark_index() as index:
+            percentile = calculate_percentile(subject, student_score, current_grade)
+            performing_grade = calculate_performing_grade(subject, student_score, current_grade)
+            next_threshold = calculate_next_grade_threshold(subject, current_grade)
         
         # Format the combined result
         result = f"Subject: {subject}\n"
         result += f"Percentile: {percentile}\n"
         result += f"Performing Grade: {performing_grade}\n"
-        result += f"Next Grade Threshold: {next_threshold}"
+        result += f"Next Grade Threshold: {next_threshold}\n"
+        result += f"Norms Version: {index.version}"
         
         return result
         
     except Exception as e:
-        return f"Error calculating all metrics: {str(e)}"
\ No newline at end of file
+        return f"Error calculating all metrics: {str(e)}"
+
+def calculate_metrics_for_subjects(subjects_json: str, current_grade: str) -> str:
+    """Calculates percentile, performing grade, and next grade threshold for every subject in one call.
+
+    Use this instead of calling calculate_all_metrics once per subject.
+
+    Args:
+        subjects_json: The full JSON list of subjects, each with an official "subject" name and a "score"
+            (e.g., '[{"subject": "End-of-Year Math: Overall (K-8)", "score": 470}]').
+        current_grade: The student's current grade level as a string.
+
+    Returns:
+        A JSON string with the norms version and one result per subject containing subject, score,
+        percentile, performing_grade and next_grade_threshold.
+    """
+    try:
+        subjects = json.loads(subjects_json) if isinstance(subjects_json, str) else subjects_json
+        names = [s["subject"] for s in subjects]
+        scores = [int(s["score"]) for s in subjects]
+
+        index = get_benchmark_index()
+        metrics = _score_rows(names, scores, [current_grade] * len(names), index)
+
+        results = [
+            {
+                "subject": subject,
+                "score": score,
+                "percentile": _percentile_text(metrics, i, subject, current_grade),
+                "performing_grade": _performing_grade_text(metrics, i, subject),
+                "next_grade_threshold": _next_grade_threshold_text(metrics, i, subject, current_grade),
+            }
+            for i, (subject, score) in enumerate(zip(names, scores))
+        ]
+        return json.dumps({"current_grade": str(current_grade), "norms_version": index.version, "results": results}, indent=2)
+
+    except Exception as e:
+        return f"Error calculating metrics for subjects: {str(e)}"
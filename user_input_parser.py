@@ -1,4 +1,8 @@
-from pdf_parser import EnhancedPDFParser
+import asyncio
+import hashlib
+import os
+from pdf_parser import EnhancedPDFParser, PARSER_VERSION, PDF_EXECUTOR, PDFSource, is_pdf_buffer, describe_pdf_source
+from sqlite_cache import SQLiteCache, CACHE_DIR
 from typing import Dict, Optional, List
 from model import get_extraction_llm
 from prompts import MULTI_PARSER_EXTRACTION_PROMPT
@@ -14,22 +18,77 @@ class PerformanceInfo(BaseModel):
     """Tool for extracting performance information from student data."""
     subjects: List[SubjectPerformance] = Field(description="List of subjects, their scores, and any recommended skills.")
 
-def parse_pdf_to_text(pdf_path: str) -> Optional[tuple]:
+# Parsed text cache, keyed by the PDF's content hash so re-uploads of the same report skip parsing
+PARSE_CACHE_PATH = os.path.join(CACHE_DIR, "parsed_pdfs.sqlite")
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_parse_cache: Optional[SQLiteCache] = None
+
+# LlamaParse outcomes worth caching; timeouts and errors may be transient, so those runs are re-parsed
+_CACHEABLE_LLAMAPARSE_STATUSES = ('ok', 'empty', 'skipped')
+
+
+def get_parse_cache() -> SQLiteCache:
+    """Returns the process-wide parsed PDF text cache."""
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = SQLiteCache(PARSE_CACHE_PATH, table="parsed_pdfs", max_bytes=PARSE_CACHE_MAX_BYTES)
+    return _parse_cache
+
+
+def pdf_cache_key(source: PDFSource) -> str:
+    """SHA-256 of the PDF bytes (read from the path, or hashed in place for a buffer) plus the parser version."""
+    if is_pdf_buffer(source):
+        digest = hashlib.sha256(source)
+    else:
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return f"{digest.hexdigest()}:{PARSER_VERSION}"
+
+
+def parse_pdf_to_text(pdf_path: PDFSource, use_cache: bool = True) -> Optional[tuple]:
     """
-    Parses a PDF file and extracts raw text content from both PyMuPDF and LlamaParse.
+    Synchronous wrapper around parse_pdf_to_text_async; must not be called
+    from a thread that is already running an event loop.
     Returns a tuple: (pymupdf_text, llamaparse_text)
     """
+    return asyncio.run(parse_pdf_to_text_async(pdf_path, use_cache))
+
+
+async def parse_pdf_to_text_async(pdf_path: PDFSource, use_cache: bool = True) -> Optional[tuple]:
+    """
+    Parses a PDF (file path, or content as bytes/memoryview) and extracts raw text content from both PyMuPDF and LlamaParse.
+    Results are served from the parse cache when the same PDF content was parsed before.
+    Hashing and cache access run on the bounded PDF executor, so the event loop never blocks.
+    Returns a tuple: (pymupdf_text, llamaparse_text)
+    """
+    loop = asyncio.get_running_loop()
     try:
+        cache_key = await loop.run_in_executor(PDF_EXECUTOR, pdf_cache_key, pdf_path) if use_cache else None
+        if cache_key:
+            cached = await loop.run_in_executor(PDF_EXECUTOR, get_parse_cache().get, cache_key)
+            if cached is not None:
+                print(f"✅ Parse cache hit for {describe_pdf_source(pdf_path)} ({get_parse_cache().stats()['hits']} hits so far)")
+                return cached['pymupdf'], cached['llamaparse']
+
         parser = EnhancedPDFParser()
-        parsed_outputs = parser.parse_pdf_report(pdf_path)
+        parsed_outputs = await parser.parse_pdf_report_async(pdf_path)
         pymupdf_text = parsed_outputs.get('pymupdf', '')
         llamaparse_text = parsed_outputs.get('llamaparse', '')
         if not pymupdf_text and not llamaparse_text:
             return None
+        llamaparse_status = parsed_outputs.get('backends', {}).get('llamaparse', {}).get('status')
+        if cache_key and llamaparse_status in _CACHEABLE_LLAMAPARSE_STATUSES:
+            await loop.run_in_executor(
+                PDF_EXECUTOR, get_parse_cache().put, cache_key, {'pymupdf': pymupdf_text, 'llamaparse': llamaparse_text}
+            )
         if pymupdf_text:
             print(f"✅ PyMuPDF extracted {len(pymupdf_text)} characters")
         if llamaparse_text:
             print(f"✅ LlamaParse extracted {len(llamaparse_text)} characters")
+        for backend, info in parsed_outputs.get('backends', {}).items():
+            print(f"--- {backend}: {info['status']} in {info['seconds']}s ---")
         return pymupdf_text, llamaparse_text
     except Exception as e:
         print(f"--- Error during PDF parsing: {e} ---")